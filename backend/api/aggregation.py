@@ -0,0 +1,54 @@
+from django.db.models import Case, CharField, F, IntegerField, Sum, Value, When
+
+from recipes.models import IngredientAmount
+
+# Единица измерения -> (базовая единица семейства, множитель).
+# Ложки и стакан пересчитываются в миллилитры по кулинарным нормам.
+# Единицы, которых нет в таблице, суммируются как есть.
+UNITS = {
+    # масса
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    # объём
+    'мл': ('мл', 1),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 250),
+    'л': ('мл', 1000),
+    # штуки
+    'шт.': ('шт.', 1),
+    'десяток': ('шт.', 10),
+}
+
+
+def _by_unit(values, default, output_field):
+    return Case(
+        *(When(ingredient__measurement_unit=unit, then=Value(value))
+          for unit, value in values.items()),
+        default=default,
+        output_field=output_field,
+    )
+
+
+BASE_UNIT = _by_unit({unit: base for unit, (base, _) in UNITS.items()},
+                     F('ingredient__measurement_unit'), CharField())
+FACTOR = _by_unit({unit: factor for unit, (_, factor) in UNITS.items()},
+                  Value(1), IntegerField())
+
+
+def aggregate_ingredients(recipe_ids):
+    """Суммирует ингредиенты рецептов одним запросом.
+
+    Количества приводятся к базовой единице своего семейства прямо
+    в базе, поэтому «1 кг» и «300 г» одного продукта дают одну строку
+    «1300 г». Возвращает итератор кортежей
+    (название, единица измерения, количество), отсортированных по названию.
+    """
+    return IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).annotate(
+        unit=BASE_UNIT,
+    ).values('ingredient__name', 'unit').annotate(
+        total=Sum(F('amount') * FACTOR, output_field=IntegerField()),
+    ).order_by('ingredient__name', 'unit').values_list(
+        'ingredient__name', 'unit', 'total').iterator()
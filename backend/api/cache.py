@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+INGREDIENTS_VERSION = 'ingredients'
+SHOPPING_LIST_VERSION = 'shopping_list'
+TAGS_VERSION = 'tags'
+
+
+def get_version(name):
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    # Если версию одновременно создают несколько воркеров, все они должны
+    # получить одно и то же значение.
+    version = time.time()
+    if cache.add(key, version, timeout=None):
+        return version
+    return cache.get(key, version)
+
+
+def get_recipe_key(pk):
+    versions = cache.get_many(
+        [VERSION_KEY.format(INGREDIENTS_VERSION),
+         VERSION_KEY.format(TAGS_VERSION)]
+    )
+    return 'recipe:{}:{}:{}'.format(
+        pk,
+        versions.get(VERSION_KEY.format(INGREDIENTS_VERSION)),
+        versions.get(VERSION_KEY.format(TAGS_VERSION))
+    )
+
+
+def _delete_recipe_cache(pks):
+    cache.delete_many([get_recipe_key(pk) for pk in pks])
+
+
+def delete_recipe_cache(*pks):
+    _delete_recipe_cache(pks)
+    # Как и с версиями: запрос, прочитавший рецепт до коммита, мог снова
+    # положить в кеш старые данные.
+    transaction.on_commit(lambda: _delete_recipe_cache(pks))
+
+
+def _set_version(name):
+    cache.set(VERSION_KEY.format(name), time.time(), timeout=None)
+
+
+def bump_version(name):
+    _set_version(name)
+    # Другой воркер может прочитать новую версию до коммита и закешировать
+    # под ней старые данные, поэтому после коммита версия меняется ещё раз.
+    transaction.on_commit(lambda: _set_version(name))
@@ -0,0 +1,27 @@
+import hashlib
+
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+
+from recipes.models import Recipe
+
+
+class HashedBase64ImageField(Base64ImageField):
+    """Сохраняет изображение под именем из хеша содержимого.
+
+    Если такой файл уже загружен, возвращает его имя, и повторная
+    запись на диск не происходит.
+    """
+
+    def get_file_name(self, decoded_file):
+        return hashlib.sha256(decoded_file).hexdigest()
+
+    def to_internal_value(self, data):
+        image = super().to_internal_value(data)
+        if image is None:
+            return image
+        name = Recipe._meta.get_field('image').generate_filename(
+            None, image.name)
+        if default_storage.exists(name):
+            return name
+        return image
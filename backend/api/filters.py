@@ -1,13 +1,9 @@
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
 
+from .search import search_recipes
 from recipes.models import Recipe, Tag
 
 
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
-
-
 class RecipeFilter(FilterSet):
     author = filters.NumberFilter(
         field_name='author__id',
@@ -22,10 +18,12 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -36,3 +34,6 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(cart__user=self.request.user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,110 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from .cache import delete_recipe_cache
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'card': (600, 600),
+    'thumbnail': (160, 160),
+    'webp': None,
+}
+VARIANTS_DIR = 'variants'
+WEBP_QUALITY = 80
+
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+_pending = {}
+_pending_lock = Lock()
+
+
+def get_variant_name(name, variant):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, VARIANTS_DIR, f'{stem}_{variant}.webp')
+
+
+def generate_variants(name):
+    missing = {
+        variant: size for variant, size in VARIANTS.items()
+        if not default_storage.exists(get_variant_name(name, variant))
+    }
+    if not missing:
+        return
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for variant, size in missing.items():
+            resized = image.copy()
+            if size:
+                resized.thumbnail(size)
+            buffer = BytesIO()
+            resized.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+            default_storage.save(get_variant_name(name, variant),
+                                 ContentFile(buffer.getvalue()))
+
+
+def mark_variants_ready(name):
+    # Одно изображение может быть у нескольких рецептов, отмечаются все.
+    recipe_ids = list(Recipe.objects.filter(image=name).exclude(
+        variants_image=name).values_list('id', flat=True))
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(variants_image=name)
+    return recipe_ids
+
+
+def _generate_variants(name):
+    close_old_connections()
+    recipe_ids = []
+    try:
+        generate_variants(name)
+        recipe_ids = mark_variants_ready(name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        with _pending_lock:
+            recipe_ids.extend(_pending.pop(name))
+        delete_recipe_cache(*recipe_ids)
+        close_old_connections()
+
+
+def _submit(name, recipe_id):
+    with _pending_lock:
+        if name in _pending:
+            _pending[name].add(recipe_id)
+            return
+        _pending[name] = {recipe_id}
+    executor.submit(_generate_variants, name)
+
+
+def schedule_variants(name, recipe_id):
+    transaction.on_commit(lambda: _submit(name, recipe_id))
+
+
+def get_variant_urls(recipe, request=None):
+    """URL вариантов изображения рецепта без обращений к хранилищу.
+
+    Готовность вариантов отмечается в самом рецепте после их создания,
+    до этого вместо каждого варианта отдаётся оригинал.
+    """
+    image = recipe.image
+    if not image:
+        return {}
+    ready = recipe.variants_image == image.name
+    urls = {}
+    for variant in VARIANTS:
+        url = (default_storage.url(get_variant_name(image.name, variant))
+               if ready else image.url)
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
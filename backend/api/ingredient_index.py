@@ -0,0 +1,60 @@
+import bisect
+import threading
+from itertools import islice
+
+from recipes.models import Ingredient
+
+from .cache import INGREDIENTS_VERSION, get_version
+
+
+class IngredientIndex:
+    """Отсортированный по названию список ингредиентов в памяти процесса.
+
+    Перестраивается при изменении версии ингредиентов, которую
+    увеличивают сигналы post_save и post_delete модели Ingredient и команда
+    loads_ingrs. Версия хранится в общем кеше, поэтому изменение из любого
+    процесса видят все воркеры.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = ([], [])
+
+    def _load(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self._version:
+            return self._data
+        with self._lock:
+            if version != self._version:
+                rows = sorted(
+                    (name.casefold(), pk, name, measurement_unit)
+                    for pk, name, measurement_unit
+                    in Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit').iterator()
+                )
+                self._data = (
+                    [row[0] for row in rows],
+                    [{'id': pk, 'name': name,
+                      'measurement_unit': measurement_unit}
+                     for _, pk, name, measurement_unit in rows]
+                )
+                self._version = version
+        return self._data
+
+    def search(self, query, limit):
+        keys, rows = self._load()
+        query = query.strip().casefold()
+        start = bisect.bisect_left(keys, query)
+        end = bisect.bisect_left(keys, query + '\U0010ffff', lo=start)
+        result = rows[start:min(end, start + limit)]
+        if len(result) < limit:
+            contains = (
+                row for key, row in zip(keys, rows)
+                if query in key and not key.startswith(query)
+            )
+            result.extend(islice(contains, limit - len(result)))
+        return result
+
+
+ingredient_index = IngredientIndex()
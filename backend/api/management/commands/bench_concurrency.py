@@ -0,0 +1,97 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from recipes.utils import percentile
+from api.management.commands.bench_endpoints import get_scenarios, get_user
+
+SCENARIOS = ('recipes', 'recipe_detail', 'ingredients_search',
+             'download_shopping_cart')
+
+
+class Command(BaseCommand):
+    help = ('load benchmark of a running server: throughput and latency '
+            'percentiles at several concurrency levels as json. Run it '
+            'against gunicorn with different worker classes and the same '
+            'number of workers to compare them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--concurrency', nargs='+', type=int,
+                            default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200,
+                            help='requests per scenario and level')
+        parser.add_argument('--only', nargs='+', default=SCENARIOS)
+        parser.add_argument('--label', default='',
+                            help='name of the run, e.g. gthread-4x4')
+        parser.add_argument('--output', default=None,
+                            help='write json to this file')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('Сначала заполните базу: seed_data')
+        token, _ = Token.objects.get_or_create(user_id=get_user())
+        self.headers = {'Authorization': f'Token {token.key}'}
+        self.sessions = threading.local()
+        scenarios = get_scenarios()
+        unknown = set(options['only']) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {sorted(unknown)}')
+        report = {
+            'label': options['label'],
+            'created': timezone.now().isoformat(),
+            'url': options['url'],
+            'requests': options['requests'],
+            'results': {},
+        }
+        for name in options['only']:
+            path, params = scenarios[name]
+            report['results'][name] = {
+                str(concurrency): self.bench(
+                    options['url'] + path, params, concurrency,
+                    options['requests'])
+                for concurrency in options['concurrency']
+            }
+        result = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(result)
+        self.stdout.write(result)
+
+    def request(self, url, params):
+        session = getattr(self.sessions, 'session', None)
+        if session is None:
+            session = self.sessions.session = requests.Session()
+            session.headers.update(self.headers)
+        start = perf_counter()
+        try:
+            status = session.get(url, params=params).status_code
+        except requests.RequestException:
+            status = None
+        return status, (perf_counter() - start) * 1000
+
+    def bench(self, url, params, concurrency, count):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Прогрев: каждый поток открывает своё соединение.
+            list(executor.map(lambda _: self.request(url, params),
+                              range(concurrency)))
+            start = perf_counter()
+            results = list(executor.map(lambda _: self.request(url, params),
+                                        range(count)))
+            elapsed = perf_counter() - start
+        timings = [timing for _, timing in results]
+        return {
+            'throughput_rps': round(count / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'errors': sum(1 for status, _ in results
+                          if status is None or status >= 500),
+        }
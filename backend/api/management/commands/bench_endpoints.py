@@ -0,0 +1,118 @@
+import json
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Cart, Ingredient, Recipe, Tag
+from recipes.utils import percentile
+from users.models import Follow
+
+
+def get_scenarios():
+    tag = Tag.objects.order_by('pk').first()
+    ingredient = Ingredient.objects.order_by('pk').first()
+    recipe = Recipe.objects.order_by('-favorites_count').first()
+    author_id = Recipe.objects.values('author').annotate(
+        total=Count('pk')).order_by('-total')[0]['author']
+    return {
+        'recipes': ('/api/recipes/', {}),
+        'recipes_page_100': ('/api/recipes/', {'page': 100}),
+        'recipes_tags': ('/api/recipes/', {'tags': tag.slug if tag else ''}),
+        'recipes_author': ('/api/recipes/', {'author': author_id}),
+        'recipes_favorited': ('/api/recipes/', {'is_favorited': 1}),
+        'recipes_in_cart': ('/api/recipes/', {'is_in_shopping_cart': 1}),
+        'recipes_search': ('/api/recipes/',
+                           {'search': recipe.name.split()[0]}),
+        'recipe_detail': (f'/api/recipes/{recipe.pk}/', {}),
+        'subscriptions': ('/api/users/subscriptions/', {'recipes_limit': 3}),
+        'ingredients_search': ('/api/ingredients/',
+                               {'name': ingredient.name[:2]}),
+        'download_shopping_cart': (
+            '/api/recipes/download_shopping_cart/', {}),
+    }
+
+
+def get_user():
+    # Пользователь с самым большим списком покупок среди тех, у кого есть
+    # подписки, чтобы все сценарии возвращали непустые ответы.
+    row = Cart.objects.filter(
+        user__in=Follow.objects.values('user')
+    ).values('user').annotate(
+        total=Count('pk')).order_by('-total', 'user').first()
+    if row is None:
+        raise CommandError('Сначала заполните базу: seed_data')
+    return row['user']
+
+
+class Command(BaseCommand):
+    help = ('benchmark of the main API routes: throughput, latency '
+            'percentiles and queries per request as json')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', default=None)
+        parser.add_argument('--label', default='',
+                            help='name of the run, e.g. commit hash')
+        parser.add_argument('--output', default=None,
+                            help='write json to this file')
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('Сначала заполните базу: seed_data')
+        token, _ = Token.objects.get_or_create(user_id=get_user())
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        scenarios = get_scenarios()
+        unknown = set(options['only'] or ()) - set(scenarios)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {sorted(unknown)}')
+        report = {
+            'label': options['label'],
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'requests': options['requests'],
+            'results': {},
+        }
+        for name, (url, params) in scenarios.items():
+            if options['only'] and name not in options['only']:
+                continue
+            report['results'][name] = self.bench(
+                client, url, params, options['requests'], options['warmup'])
+        result = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(result)
+        self.stdout.write(result)
+
+    @staticmethod
+    def request(client, url, params):
+        response = client.get(url, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def bench(self, client, url, params, requests, warmup):
+        for _ in range(warmup):
+            self.request(client, url, params)
+        timings, queries = [], 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                response = self.request(client, url, params)
+                timings.append((perf_counter() - start) * 1000)
+            queries += len(context)
+        return {
+            'status': response.status_code,
+            'throughput_rps': round(requests * 1000 / sum(timings), 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries_per_request': queries / requests,
+        }
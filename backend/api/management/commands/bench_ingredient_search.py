@@ -0,0 +1,49 @@
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from recipes.utils import percentile
+
+
+def search_orm(query, limit):
+    return list(Ingredient.objects.filter(name__istartswith=query).values(
+        'id', 'name', 'measurement_unit'))
+
+
+def search_index(query, limit):
+    return ingredient_index.search(query, limit)
+
+
+class Command(BaseCommand):
+    help = 'benchmark of ingredient autocomplete: orm versus prefix index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Сначала загрузите ингредиенты: loads_ingrs')
+        rng = random.Random(options['seed'])
+        queries = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            queries.append(name[:rng.randint(1, min(4, len(name)))])
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        ingredient_index.search('', limit)
+        for label, search in (('orm', search_orm), ('index', search_index)):
+            timings = []
+            for query in queries:
+                start = perf_counter()
+                search(query, limit)
+                timings.append((perf_counter() - start) * 1000)
+            self.stdout.write(
+                f'{label}: {len(queries)} запросов по {len(names)} '
+                f'ингредиентам, p50 {percentile(timings, 50):.3f} мс, '
+                f'p99 {percentile(timings, 99):.3f} мс'
+            )
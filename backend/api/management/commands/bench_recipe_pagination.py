@@ -0,0 +1,58 @@
+import statistics
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.pagination import Cursor
+
+from api.pagination import RecipeCursorPagination
+from recipes.models import Recipe
+
+URL = '/api/recipes/'
+
+
+class Command(BaseCommand):
+    help = 'benchmark of recipe feed pagination: page numbers versus cursor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', nargs='+', type=int, default=[1, 500])
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('Нет рецептов, сначала заполните базу')
+        self.client = Client()
+        self.repeat = options['repeat']
+        limit = options['limit']
+        for page in options['pages']:
+            self.bench(f'page={page}', {'page': page, 'limit': limit})
+            self.bench(f'cursor, страница {page}',
+                       {'cursor': self.get_cursor(page, limit),
+                        'limit': limit})
+
+    @staticmethod
+    def get_cursor(page, limit):
+        if page == 1:
+            return ''
+        pagination = RecipeCursorPagination()
+        pagination.base_url = URL
+        position = Recipe.objects.order_by(
+            *pagination.ordering).values_list('pub_date', flat=True)[
+            (page - 1) * limit - 1]
+        url = pagination.encode_cursor(Cursor(0, False, str(position)))
+        return parse_qs(urlsplit(url).query)[pagination.cursor_query_param][0]
+
+    def bench(self, label, params):
+        timings = []
+        for _ in range(self.repeat):
+            start = perf_counter()
+            response = self.client.get(URL, params)
+            timings.append((perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{label}: ответ {response.status_code}')
+        self.stdout.write(
+            f'{label}: медиана {statistics.median(timings):.1f} мс, '
+            f'максимум {max(timings):.1f} мс'
+        )
@@ -0,0 +1,60 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.search import search_recipes
+from recipes.models import Recipe
+from recipes.utils import percentile
+
+
+class Command(BaseCommand):
+    help = 'benchmark of full-text recipe search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--sample', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('Нет рецептов, сначала заполните базу')
+        words = self.get_words(options['sample'])
+        rng = random.Random(options['seed'])
+        queries = [
+            ' '.join(rng.sample(words, rng.choice((1, 1, 2))))
+            for _ in range(options['queries'])
+        ]
+        limit = options['limit']
+        page_timings, count_timings = [], []
+        for query in queries:
+            queryset = search_recipes(Recipe.objects.all(), query)
+            start = perf_counter()
+            list(queryset.values_list('id', flat=True)[:limit])
+            page_timings.append((perf_counter() - start) * 1000)
+            start = perf_counter()
+            queryset.count()
+            count_timings.append((perf_counter() - start) * 1000)
+        for label, timings in (('страница', page_timings),
+                               ('count', count_timings)):
+            self.stdout.write(
+                f'{label}: {len(queries)} запросов по {total} рецептам '
+                f'({connection.vendor}), p50 {percentile(timings, 50):.1f} '
+                f'мс, p95 {percentile(timings, 95):.1f} мс, '
+                f'p99 {percentile(timings, 99):.1f} мс'
+            )
+
+    @staticmethod
+    def get_words(sample):
+        names = Recipe.objects.order_by('?').values_list(
+            'name', flat=True)[:sample]
+        words = sorted({
+            word.lower() for name in names for word in name.split()
+            if len(word) > 2
+        })
+        if not words:
+            raise CommandError('В названиях рецептов нет слов для поиска')
+        return words
@@ -0,0 +1,46 @@
+import statistics
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.aggregation import aggregate_ingredients
+from recipes.models import Recipe
+from recipes.utils import percentile
+
+
+class Command(BaseCommand):
+    help = ('benchmark of shopping list aggregation with unit conversion, '
+            'checks that a cart of any size takes a single query')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int,
+                            default=[10, 100, 500])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+            'pk', flat=True)[:max(options['sizes'])])
+        if not recipe_ids:
+            raise CommandError('Сначала заполните базу: seed_data')
+        for size in options['sizes']:
+            self.bench(recipe_ids[:size], options['repeat'])
+
+    def bench(self, recipe_ids, repeat):
+        timings, queries = [], set()
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                rows = sum(1 for _ in aggregate_ingredients(recipe_ids))
+                timings.append((perf_counter() - start) * 1000)
+            queries.add(len(context))
+        self.stdout.write(
+            f'{len(recipe_ids)} рецептов, {rows} строк: '
+            f'медиана {statistics.median(timings):.1f} мс, '
+            f'p95 {percentile(timings, 95):.1f} мс, '
+            f'запросов {max(queries)}'
+        )
+        if queries != {1}:
+            raise CommandError(
+                f'Агрегация заняла {max(queries)} запросов вместо одного')
@@ -0,0 +1,53 @@
+import statistics
+import tracemalloc
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import (TEXT_WRITERS, register_fonts,
+                               render_shopping_list, stream_file)
+
+FORMATS = ('pdf', *TEXT_WRITERS)
+
+
+def render(document_format, items):
+    if document_format == 'pdf':
+        return stream_file(render_shopping_list(items))
+    return TEXT_WRITERS[document_format](items)
+
+
+class Command(BaseCommand):
+    help = 'benchmark of shopping list rendering in every export format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int,
+                            default=[10, 1000, 10000])
+        parser.add_argument('--formats', nargs='+', choices=FORMATS,
+                            default=FORMATS)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        register_fonts()
+        for size in options['sizes']:
+            items = [(f'ингредиент {i}', 'г', i) for i in range(size)]
+            for document_format in options['formats']:
+                self.bench(document_format, items, options['repeat'])
+
+    def bench(self, document_format, items, repeat):
+        timings = []
+        tracemalloc.start()
+        for _ in range(repeat):
+            start = perf_counter()
+            document_size = sum(
+                len(chunk) for chunk in render(document_format, items)
+            )
+            timings.append((perf_counter() - start) * 1000)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{document_format} {len(items)} строк: '
+            f'медиана {statistics.median(timings):.1f} мс, '
+            f'максимум {max(timings):.1f} мс, '
+            f'пик памяти {peak / 1024 / 1024:.1f} МБ, '
+            f'размер {document_size / 1024:.0f} КБ'
+        )
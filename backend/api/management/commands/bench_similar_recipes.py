@@ -0,0 +1,62 @@
+import random
+from time import perf_counter
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from recipes.similarity import update_similar
+from recipes.utils import percentile
+
+
+class Command(BaseCommand):
+    help = ('benchmark of similar recipes: full rebuild, incremental '
+            'update and the similar endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        total = Recipe.objects.count()
+        if not total:
+            raise CommandError('Нет рецептов, сначала заполните базу')
+        if not options['skip_rebuild']:
+            start = perf_counter()
+            call_command('rebuild_similar', stdout=self.stdout)
+            self.stdout.write(f'перестройка {total} рецептов: '
+                              f'{perf_counter() - start:.1f} с')
+        recipe_ids = random.Random(options['seed']).sample(
+            list(Recipe.objects.values_list('pk', flat=True)),
+            min(options['samples'], total))
+        client = Client()
+        for label, run in (
+            ('обновление', update_similar),
+            ('эндпоинт', lambda pk: client.get(
+                f'/api/recipes/{pk}/similar/')),
+        ):
+            self.report(label, total, *self.bench(run, recipe_ids))
+
+    @staticmethod
+    def bench(run, recipe_ids):
+        timings, queries = [], 0
+        for recipe_id in recipe_ids:
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                run(recipe_id)
+                timings.append((perf_counter() - start) * 1000)
+            queries += len(context)
+        return timings, queries / len(recipe_ids)
+
+    def report(self, label, total, timings, queries):
+        self.stdout.write(
+            f'{label}: {len(timings)} рецептов из {total} '
+            f'({connection.vendor}), p50 {percentile(timings, 50):.1f} мс, '
+            f'p95 {percentile(timings, 95):.1f} мс, '
+            f'p99 {percentile(timings, 99):.1f} мс, '
+            f'запросов {queries:.1f}'
+        )
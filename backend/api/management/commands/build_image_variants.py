@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.cache import delete_recipe_cache
+from api.images import generate_variants, mark_variants_ready
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'build missing image variants and mark recipes that have them'
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True).exclude(variants_image=F('image')).order_by(
+            'image').values_list('image', flat=True).distinct()
+        ready = failed = 0
+        for name in names.iterator():
+            try:
+                generate_variants(name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            delete_recipe_cache(*mark_variants_ready(name))
+            ready += 1
+        self.stdout.write(
+            f'Изображений с вариантами: {ready}, с ошибками: {failed}')
@@ -0,0 +1,113 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from api.aggregation import aggregate_ingredients
+from api.views import RecipeViewSet
+from recipes.models import Cart, Tag
+from users.models import User
+from users.views import FollowListViewSet
+
+LARGE_TABLES = (
+    'recipes_recipe',
+    'recipes_recipe_tags',
+    'recipes_ingredientamount',
+    'recipes_favoriterecipe',
+    'recipes_cart',
+    'users_follow',
+)
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'SCAN (?:TABLE )?(\w+)(?!.*USING)'),
+}
+EXPLAIN = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+def find_sequential_scans(plan, vendor):
+    pattern = SEQUENTIAL_SCAN[vendor]
+    return sorted({
+        table for line in plan.splitlines()
+        for table in pattern.findall(line)
+        if table in LARGE_TABLES
+    })
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(EXPLAIN[connection.vendor] + sql)
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+def list_page(view_class, user, params):
+    # Страница собирается так же, как в запросе к API: фильтры,
+    # пагинация, аннотации и prefetch_related самой view.
+    request = Request(RequestFactory().get('/', params))
+    request.user = user
+    view = view_class(request=request, args=(), kwargs={},
+                      format_kwarg=None, action='list')
+    return list(view.paginate_queryset(
+        view.filter_queryset(view.get_queryset())))
+
+
+def get_hot_queries(user, tag):
+    """Запросы горячих путей API в том виде, в каком их выполняет код.
+
+    Возвращает словарь: название пути -> список SQL всех его запросов.
+    """
+    recipe_ids = list(Cart.objects.filter(user=user).values_list(
+        'recipe_id', flat=True))
+    paths = {
+        'лента рецептов': lambda: list_page(RecipeViewSet, user, {}),
+        'лента по курсору': lambda: list_page(
+            RecipeViewSet, user, {'cursor': ''}),
+        'лента по тегу': lambda: list_page(
+            RecipeViewSet, user, {'tags': tag.slug}),
+        'рецепты автора': lambda: list_page(
+            RecipeViewSet, user, {'author': user.id}),
+        'избранное': lambda: list_page(
+            RecipeViewSet, user, {'is_favorited': 1}),
+        'список покупок': lambda: list_page(
+            RecipeViewSet, user, {'is_in_shopping_cart': 1}),
+        'агрегация корзины': lambda: list(aggregate_ingredients(recipe_ids)),
+        'подписки': lambda: list_page(
+            FollowListViewSet, user, {'limit': 10, 'recipes_limit': 3}),
+    }
+    queries = {}
+    for name, run in paths.items():
+        with CaptureQueriesContext(connection) as context:
+            run()
+        queries[name] = [query['sql'] for query in context.captured_queries]
+    return queries
+
+
+class Command(BaseCommand):
+    help = ('explain hot API queries and fail '
+            'if a sequential scan of a large table appears')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            raise CommandError(f'СУБД {connection.vendor} не поддерживается')
+        user = User.objects.order_by('id').first()
+        tag = Tag.objects.order_by('id').first()
+        if user is None or tag is None:
+            raise CommandError('Нет данных, сначала заполните базу')
+        failures = []
+        for name, queries in get_hot_queries(user, tag).items():
+            for sql in queries:
+                plan = explain(sql)
+                scans = find_sequential_scans(plan, connection.vendor)
+                self.stdout.write(f'--- {name}\n{sql}\n{plan}')
+                if scans:
+                    failures.append(f'{name}: {", ".join(scans)}')
+        if failures:
+            raise CommandError(
+                'Последовательное чтение больших таблиц:\n'
+                + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
@@ -0,0 +1,48 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_version
+from api_foodgram.metrics import count_cache
+
+
+class CachedListMixin:
+    """Отдаёт список без фильтров из кеша с заголовками ETag и Last-Modified.
+
+    Ответ хранится в виде готового JSON под ключом с версией модели,
+    поэтому при изменении данных старые записи просто перестают читаться.
+    ETag - хеш этого JSON, так что он всегда соответствует телу ответа,
+    каким бы воркером и когда бы тот ни был построен.
+    """
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        version = get_version(self.cache_version_name)
+        content, etag = self.get_cached_content(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(version))
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        patch_cache_control(response, public=True,
+                            max_age=settings.REFERENCE_DATA_MAX_AGE)
+        return response
+
+    def get_cached_content(self, version):
+        key = f'list:{self.cache_version_name}:{version}'
+        cached = cache.get(key)
+        count_cache('reference_list', cached is not None)
+        if cached is None:
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            content = JSONRenderer().render(serializer.data)
+            cached = (content, quote_etag(hashlib.md5(content).hexdigest()))
+            cache.set(key, cached)
+        return cached
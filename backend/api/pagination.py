@@ -1,6 +1,45 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipePaginator(Paginator):
+    @cached_property
+    def count(self):
+        # Флаги пользователя в аннотациях не меняют числа рецептов, а с
+        # ними COUNT превращается в подзапрос с GROUP BY и тремя EXISTS
+        # на каждый рецепт. Фильтры на аннотации не опираются.
+        queryset = self.object_list.all()
+        queryset.query.annotations.clear()
+        queryset.query.set_annotation_mask(None)
+        return queryset.count()
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class RecipePagination(CustomPageNumberPagination):
+    django_paginator_class = RecipePaginator
+    cursor_pagination_class = RecipeCursorPagination
+    cursor_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_pagination = self.cursor_pagination_class()
+        if cursor_pagination.cursor_query_param in request.query_params:
+            self.cursor_pagination = cursor_pagination
+            return cursor_pagination.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,51 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+from recipes.fts import FTS_TABLE
+
+SEARCH_CONFIG = 'russian'
+WORD_RE = re.compile(r'\w+')
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск по названию и описанию рецепта.
+
+    Результаты упорядочены по релевантности, совпадения в названии
+    весят больше, последнее слово запроса ищется как префикс.
+    """
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return search_postgresql(queryset, words)
+    return search_sqlite(queryset, words)
+
+
+def search_postgresql(queryset, words):
+    # Вектор поддерживает триггер из миграции, поиск идёт по GIN-индексу.
+    search_query = SearchQuery(
+        ' & '.join(words[:-1] + [f'{words[-1]}:*']),
+        config=SEARCH_CONFIG,
+        search_type='raw',
+    )
+    return queryset.filter(search_vector=search_query).order_by(
+        SearchRank(F('search_vector'), search_query).desc(),
+        '-pub_date', '-id',
+    )
+
+
+def search_sqlite(queryset, words):
+    table = queryset.model._meta.db_table
+    match = ' '.join(
+        [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+    # Соединение с таблицей FTS5: индекс отдаёт совпадения вместе с оценкой
+    # bm25 в скрытом столбце rank, а рецепты подтягиваются по ключу.
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).order_by(RawSQL(f'{FTS_TABLE}.rank', ()).asc(), '-pub_date', '-id')
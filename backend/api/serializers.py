@@ -1,13 +1,22 @@
-from django.shortcuts import get_object_or_404
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from .cache import SHOPPING_LIST_VERSION, bump_version, delete_recipe_cache
+from .fields import HashedBase64ImageField
+from .images import get_variant_urls
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             IngredientAmount, Cart, Tag)
+from recipes.similarity import schedule_update
 from users.serializers import CustomUserSerializer
 
+BULK_RECIPES_MAX = 100
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,14 +59,29 @@ class RecipeListSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_variants',
+                  'text', 'cooking_time')
         model = Recipe
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        data = super().to_representation(instance)
+        variant = self.context.get('image_variant')
+        if variant and data['image_variants']:
+            data['image'] = data['image_variants'][variant]
+        return data
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj, self.context.get('request'))
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -65,6 +89,8 @@ class RecipeListSerializer(serializers.ModelSerializer):
             favorites__user=user, id=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -81,12 +107,11 @@ class IngredientsEditSerializer(serializers.ModelSerializer):
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all())
+    tags = serializers.ListField(
+        child=serializers.IntegerField())
     ingredients = IngredientsEditSerializer(
         many=True)
-    image = Base64ImageField(
+    image = HashedBase64ImageField(
         max_length=None,
         use_url=True)
 
@@ -95,34 +120,44 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('author',)
 
-    def validate(self, data):
-        ingredients = data['ingredients']
+    @staticmethod
+    def format_ids(ids):
+        return ', '.join(str(pk) for pk in sorted(ids))
+
+    def validate_ingredients(self, ingredients):
         if not ingredients:
-            raise serializers.ValidationError({
-                'ingredients': 'Нужен хоть один ингредиент для рецепта'})
-        ingredient_list = []
-        for ingredient_item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=ingredient_item['id'])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError('Ингредиенты должны '
-                                                  'быть уникальными')
-            ingredient_list.append(ingredient)
-            if int(ingredient_item['amount']) < 0:
-                raise serializers.ValidationError({
-                    'ingredients': ('Убедитесь, что значение количества '
-                                    'ингредиента больше 0')
-                })
-        tags = data['tags']
+            raise serializers.ValidationError(
+                'Нужен хоть один ингредиент для рецепта')
+        ids = Counter(item['id'] for item in ingredients)
+        errors = []
+        duplicates = [pk for pk, count in ids.items() if count > 1]
+        if duplicates:
+            errors.append('Ингредиенты должны быть уникальными, '
+                          f'повторяются: {self.format_ids(duplicates)}')
+        missing = set(ids) - set(Ingredient.objects.in_bulk(ids))
+        if missing:
+            errors.append('Ингредиентов не существует: '
+                          f'{self.format_ids(missing)}')
+        wrong_amount = {item['id'] for item in ingredients
+                        if int(item['amount']) < 0}
+        if wrong_amount:
+            errors.append('Убедитесь, что значение количества ингредиента '
+                          f'больше 0: {self.format_ids(wrong_amount)}')
+        if errors:
+            raise serializers.ValidationError(errors)
+        return ingredients
+
+    def validate_tags(self, tags):
         if not tags:
             raise serializers.ValidationError(
                 'Нужен хотя бы один тег для рецепта!')
-        for tag_name in tags:
-            if not Tag.objects.filter(name=tag_name).exists():
-                raise serializers.ValidationError(
-                    f'Тега {tag_name} не существует!')
-        return data
+        tags = set(tags)
+        missing = tags - set(
+            Tag.objects.filter(id__in=tags).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                f'Тегов не существует: {self.format_ids(missing)}')
+        return list(tags)
 
     def create_ingredients(self, ingredients, recipe):
         bulk_list = list()
@@ -133,27 +168,81 @@ class RecipeSerializer(serializers.ModelSerializer):
                 amount=ingredient.get('amount')))
         IngredientAmount.objects.bulk_create(bulk_list)
 
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        existing = {
+            amount.ingredient_id: amount
+            for amount in IngredientAmount.objects.filter(recipe=recipe)
+        }
+        submitted = {item['id']: item['amount'] for item in ingredients}
+        removed = [amount.pk for ingredient_id, amount in existing.items()
+                   if ingredient_id not in submitted]
+        created, updated = [], []
+        for ingredient_id, amount in submitted.items():
+            if ingredient_id not in existing:
+                created.append(IngredientAmount(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=amount))
+            elif existing[ingredient_id].amount != amount:
+                existing[ingredient_id].amount = amount
+                updated.append(existing[ingredient_id])
+        if removed:
+            IngredientAmount.objects.filter(pk__in=removed).delete()
+        IngredientAmount.objects.bulk_create(created)
+        IngredientAmount.objects.bulk_update(updated, ['amount'])
+        return bool(removed or created or updated)
+
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(author=author, **validated_data)
-        recipe.tags.set(tags)
-        self.create_ingredients(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(author=author, **validated_data)
+            recipe.tags.set(tags)
+            self.create_ingredients(ingredients, recipe)
         return recipe
 
     def update(self, instance, validated_data):
-        if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
-        if 'tags' in validated_data:
-            instance.tags.set(
-                validated_data.pop('tags'))
-        return super().update(
-            instance, validated_data)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        changed_fields = [
+            name for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        for name in changed_fields:
+            setattr(instance, name, validated_data[name])
+        ingredients_changed = False
+        # Теги рецепта уже загружены через prefetch_related во вьюсете.
+        tags_changed = tags is not None and set(tags) != {
+            tag.pk for tag in instance.tags.all()}
+        with transaction.atomic():
+            if ingredients is not None:
+                ingredients_changed = self.update_ingredients(
+                    ingredients, instance)
+            if tags_changed:
+                instance.tags.set(tags)
+            if changed_fields:
+                instance.save(update_fields=changed_fields)
+            # Массовые запросы к ингредиентам не отправляют сигналы,
+            # похожие рецепты для тегов и нового рецепта пересчитываются
+            # в сигналах.
+            if ingredients_changed:
+                schedule_update(instance.pk)
+        # По той же причине кеши сбрасываются здесь, если сам рецепт не
+        # сохранялся.
+        if ingredients_changed and not changed_fields:
+            delete_recipe_cache(instance.pk)
+            bump_version(SHOPPING_LIST_VERSION)
+        return instance
 
     def to_representation(self, instance):
+        # После записи кеш prefetch сброшен, без повторной загрузки каждый
+        # ингредиент ответа читался бы отдельным запросом.
+        prefetch_related_objects(
+            [instance], 'tags', Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient')))
         return RecipeListSerializer(
             instance,
             context={
@@ -161,6 +250,22 @@ class RecipeSerializer(serializers.ModelSerializer):
             }).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX,
+        error_messages={
+            'empty': 'Передайте хотя бы один рецепт',
+            'max_length': 'За один запрос можно передать не больше '
+                          '{max_length} рецептов',
+        },
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
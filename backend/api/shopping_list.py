@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import BoundedSemaphore
+
+from django.conf import settings
+from django.core.cache import caches
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.exceptions import APIException
+
+from api_foodgram.metrics import PDF_RENDER_DURATION
+
+FONT_NAME = 'RussianPunk'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'data', 'RussianPunk.ttf')
+
+TITLE = 'Список покупок'
+TITLE_SIZE = 24
+LINE_SIZE = 16
+LINE_HEIGHT = 25
+LEFT_MARGIN = 75
+TOP_MARGIN = 800
+BOTTOM_MARGIN = 50
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+CACHED_DOCUMENT_MAX_SIZE = 1024 * 1024
+
+document_cache = caches['shopping_lists']
+
+render_executor = ThreadPoolExecutor(
+    max_workers=settings.PDF_RENDER_WORKERS, thread_name_prefix='pdf')
+# Сколько документов может рисоваться и ждать очереди одновременно.
+_render_slots = BoundedSemaphore(
+    settings.PDF_RENDER_WORKERS + settings.PDF_RENDER_QUEUE)
+
+
+class RenderBusy(APIException):
+    status_code = 503
+    default_detail = ('Сервер занят подготовкой других списков покупок, '
+                      'попробуйте позже.')
+    default_code = 'render_busy'
+    wait = 1
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def _start_page(page, title=None):
+    height = TOP_MARGIN
+    if title:
+        page.setFont(FONT_NAME, size=TITLE_SIZE)
+        page.drawString(200, height, title)
+        height -= 2 * LINE_HEIGHT
+    page.setFont(FONT_NAME, size=LINE_SIZE)
+    return height
+
+
+@PDF_RENDER_DURATION.time()
+def render_shopping_list(items, title=TITLE):
+    """Рисует список покупок, при необходимости на нескольких страницах.
+
+    items - итерируемое из кортежей (название, единица измерения, количество).
+    Возвращает файловый объект с PDF, указатель стоит в начале файла.
+    Небольшие документы остаются в памяти, крупные сбрасываются на диск.
+    """
+    register_fonts()
+    document = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    page = canvas.Canvas(document, pagesize=A4)
+    height = _start_page(page, title)
+    for number, (name, measurement_unit, total) in enumerate(items, 1):
+        if height < BOTTOM_MARGIN:
+            page.showPage()
+            height = _start_page(page)
+        page.drawString(LEFT_MARGIN, height,
+                        f'{number}. {name} - {total} {measurement_unit}')
+        height -= LINE_HEIGHT
+    page.showPage()
+    page.save()
+    document.seek(0)
+    return document
+
+
+def render_bounded(items, title=TITLE):
+    """Рисует PDF в общем пуле потоков с ограниченным числом мест.
+
+    Отрисовка нагружает процессор, поэтому одновременно идёт не больше
+    PDF_RENDER_WORKERS документов, а когда занята и очередь,
+    запрос сразу получает 503 вместо долгого ожидания.
+    """
+    if not _render_slots.acquire(blocking=False):
+        raise RenderBusy
+    try:
+        # Строки читаются из базы в потоке запроса: соединения
+        # Django привязаны к потоку, в котором открыты.
+        return render_executor.submit(
+            render_shopping_list, list(items), title).result()
+    finally:
+        _render_slots.release()
+
+
+def stream_file(document, chunk_size=CHUNK_SIZE):
+    with document:
+        for chunk in iter(lambda: document.read(chunk_size), b''):
+            yield chunk
+
+
+class _LineBuffer:
+    def write(self, line):
+        return line
+
+
+def iter_text(items, title=TITLE):
+    yield f'{title}\n\n'
+    for number, (name, measurement_unit, total) in enumerate(items, 1):
+        yield f'{number}. {name} - {total} {measurement_unit}\n'
+
+
+def iter_csv(items):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(('name', 'measurement_unit', 'total'))
+    for item in items:
+        yield writer.writerow(item)
+
+
+def iter_json(items):
+    separator = ''
+    yield '['
+    for name, measurement_unit, total in items:
+        yield separator + json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'total': total,
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+TEXT_WRITERS = {
+    'txt': iter_text,
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+def get_document_key(recipe_ids, version, document_format='pdf'):
+    content = ','.join(str(recipe_id) for recipe_id in sorted(recipe_ids))
+    return hashlib.sha1(
+        f'{version}:{document_format}:{content}'.encode()
+    ).hexdigest()
+
+
+def stream_cached(key):
+    content = document_cache.get(key)
+    if content is None:
+        return None
+    return (content[i:i + CHUNK_SIZE]
+            for i in range(0, len(content), CHUNK_SIZE))
+
+
+def stream_and_cache(document, key, max_size=CACHED_DOCUMENT_MAX_SIZE):
+    chunks, size = [], 0
+    for chunk in stream_file(document):
+        size += len(chunk)
+        if size <= max_size:
+            chunks.append(chunk)
+        yield chunk
+    if size <= max_size:
+        document_cache.set(key, b''.join(chunks))
@@ -0,0 +1,69 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import (INGREDIENTS_VERSION, SHOPPING_LIST_VERSION, TAGS_VERSION,
+                    bump_version, delete_recipe_cache)
+from .images import schedule_variants
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def bump_shopping_list_version(sender, **kwargs):
+    bump_version(SHOPPING_LIST_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if instance.image:
+        schedule_variants(instance.image.name, instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_cache_on_recipe_change(sender, instance, **kwargs):
+    delete_recipe_cache(instance.pk)
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def delete_recipe_cache_on_amount_change(sender, instance, **kwargs):
+    delete_recipe_cache(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def delete_recipe_cache_on_tags_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        delete_recipe_cache(instance.pk)
+    elif pk_set:
+        delete_recipe_cache(*pk_set)
+    else:
+        bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=User)
+def delete_recipe_cache_on_author_change(sender, instance, created,
+                                         update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    delete_recipe_cache(*instance.recipes.values_list('id', flat=True))
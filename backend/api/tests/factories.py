@@ -0,0 +1,51 @@
+import base64
+from io import BytesIO
+from itertools import count
+
+from PIL import Image
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+_numbers = count(1)
+
+
+def get_image_data(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+def create_user(**kwargs):
+    number = next(_numbers)
+    kwargs.setdefault('email', f'user{number}@foodgram.ru')
+    kwargs.setdefault('username', f'user{number}')
+    return User.objects.create_user(**kwargs)
+
+
+def create_tag(**kwargs):
+    number = next(_numbers)
+    kwargs.setdefault('name', f'Тег {number}')
+    kwargs.setdefault('slug', f'tag{number}')
+    return Tag.objects.create(**kwargs)
+
+
+def create_ingredient(name=None, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name or f'Ингредиент {next(_numbers)}',
+        measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, tags=(), ingredients=(), **kwargs):
+    kwargs.setdefault('name', f'Рецепт {next(_numbers)}')
+    kwargs.setdefault('text', 'Описание рецепта')
+    kwargs.setdefault('cooking_time', 10)
+    recipe = Recipe.objects.create(author=author, **kwargs)
+    recipe.tags.set(tags)
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in dict(ingredients).items()
+    )
+    return recipe
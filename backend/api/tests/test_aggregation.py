@@ -0,0 +1,60 @@
+from django.test import TestCase
+
+from .factories import create_ingredient, create_recipe, create_user
+from api.aggregation import aggregate_ingredients
+
+
+class AggregateIngredientsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user()
+        ingredients = {
+            ('мука', 'г'): 300,
+            ('мука', 'кг'): 1,
+            ('молоко', 'мл'): 100,
+            ('молоко', 'ч. л.'): 2,
+            ('молоко', 'ст. л.'): 3,
+            ('молоко', 'стакан'): 1,
+            ('молоко', 'л'): 2,
+            ('яйца', 'шт.'): 3,
+            ('яйца', 'десяток'): 2,
+            ('соль', 'щепотка'): 1,
+        }
+        cls.ingredients = {
+            key: create_ingredient(*key) for key in ingredients}
+        cls.first = create_recipe(author, ingredients={
+            cls.ingredients[key]: amount
+            for key, amount in ingredients.items()})
+        cls.second = create_recipe(author, ingredients={
+            cls.ingredients['мука', 'кг']: 2,
+            cls.ingredients['соль', 'щепотка']: 2,
+        })
+
+    def aggregate(self, *recipes):
+        return list(aggregate_ingredients(recipe.id for recipe in recipes))
+
+    def test_units_are_normalised(self):
+        self.assertEqual(self.aggregate(self.first), [
+            ('молоко', 'мл', 100 + 2 * 5 + 3 * 15 + 250 + 2 * 1000),
+            ('мука', 'г', 1300),
+            ('соль', 'щепотка', 1),
+            ('яйца', 'шт.', 23),
+        ])
+
+    def test_amounts_are_summed_across_recipes(self):
+        self.assertEqual(self.aggregate(self.first, self.second), [
+            ('молоко', 'мл', 2405),
+            ('мука', 'г', 3300),
+            ('соль', 'щепотка', 3),
+            ('яйца', 'шт.', 23),
+        ])
+
+    def test_units_of_different_families_are_not_mixed(self):
+        sugar_grams = create_ingredient('сахар', 'г')
+        sugar_spoons = create_ingredient('сахар', 'ст. л.')
+        recipe = create_recipe(create_user(), ingredients={
+            sugar_grams: 50, sugar_spoons: 2})
+        self.assertEqual(self.aggregate(recipe), [
+            ('сахар', 'г', 50),
+            ('сахар', 'мл', 30),
+        ])
@@ -0,0 +1,124 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .factories import create_recipe, create_user
+from api.serializers import BULK_RECIPES_MAX
+from api.views import RecipeViewSet
+from recipes.models import Cart, FavoriteRecipe, Recipe
+
+FAVORITE_URL = '/api/recipes/favorite/'
+CART_URL = '/api/recipes/shopping_cart/'
+MISSING_ID = 10 ** 6
+
+
+class BulkEndpointsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        author = create_user()
+        cls.recipes = [create_recipe(author) for _ in range(20)]
+        cls.ids = [recipe.id for recipe in cls.recipes]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, ids):
+        return self.client.post(url, {'recipes': ids}, format='json')
+
+    def delete(self, url, ids):
+        return self.client.delete(url, {'recipes': ids}, format='json')
+
+    def get_counters(self, field):
+        return dict(Recipe.objects.filter(id__in=self.ids).values_list(
+            'id', field))
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(item['id'], item['status'])
+                for item in response.data['results']]
+
+    def test_add_statuses(self):
+        first, second, third = self.ids[:3]
+        FavoriteRecipe.objects.create(user=self.user, recipe_id=second)
+        response = self.post(FAVORITE_URL,
+                             [first, first, second, MISSING_ID, third])
+        self.assertEqual(self.get_statuses(response), [
+            (first, 'added'),
+            (second, 'exists'),
+            (MISSING_ID, 'not_found'),
+            (third, 'added'),
+        ])
+
+    def test_delete_statuses(self):
+        first, second = self.ids[:2]
+        Cart.objects.create(user=self.user, recipe_id=first)
+        response = self.delete(CART_URL, [first, second, first, MISSING_ID])
+        self.assertEqual(self.get_statuses(response), [
+            (first, 'removed'),
+            (second, 'absent'),
+            (MISSING_ID, 'not_found'),
+        ])
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_counters(self):
+        for url, model, field in (
+            (FAVORITE_URL, FavoriteRecipe, 'favorites_count'),
+            (CART_URL, Cart, 'in_carts_count'),
+        ):
+            with self.subTest(field=field):
+                model.objects.create(user=self.user, recipe_id=self.ids[0])
+                self.post(url, self.ids[:10])
+                self.assertEqual(
+                    self.get_counters(field),
+                    {pk: int(pk in self.ids[:10]) for pk in self.ids})
+                self.delete(url, self.ids[5:15])
+                self.assertEqual(
+                    self.get_counters(field),
+                    {pk: int(pk in self.ids[:5]) for pk in self.ids})
+
+    def test_concurrent_insert_does_not_skew_counters(self):
+        racing = self.ids[0]
+        # Другой запрос добавил рецепт после того, как список уже
+        # существующих был прочитан.
+        FavoriteRecipe.objects.create(user=self.user, recipe_id=racing)
+        with mock.patch.object(RecipeViewSet, 'get_present',
+                               side_effect=[set(), {racing}]):
+            response = self.post(FAVORITE_URL, self.ids[:3])
+        self.assertEqual(self.get_statuses(response), [
+            (racing, 'exists'),
+            (self.ids[1], 'added'),
+            (self.ids[2], 'added'),
+        ])
+        self.assertEqual(
+            self.get_counters('favorites_count'),
+            {pk: int(pk in self.ids[:3]) for pk in self.ids})
+
+    def test_queries_do_not_depend_on_batch_size(self):
+        counts = []
+        for ids in (self.ids[:1], self.ids[1:]):
+            for method in (self.post, self.delete):
+                with CaptureQueriesContext(connection) as context:
+                    method(FAVORITE_URL, ids)
+                counts.append(len(context))
+        self.assertEqual(counts[:2], counts[2:])
+
+    def test_batch_limits(self):
+        self.assertEqual(self.post(FAVORITE_URL, []).status_code, 400)
+        self.assertEqual(
+            self.post(FAVORITE_URL,
+                      list(range(1, BULK_RECIPES_MAX + 2))).status_code,
+            400)
+
+    @skipUnless(connection.features.has_select_for_update,
+                'СУБД не поддерживает SELECT ... FOR UPDATE')
+    def test_delete_locks_rows(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe_id=self.ids[0])
+        with CaptureQueriesContext(connection) as context:
+            self.delete(FAVORITE_URL, self.ids[:1])
+        self.assertTrue(any('FOR UPDATE' in query['sql']
+                            for query in context.captured_queries))
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .factories import (create_ingredient, create_tag, create_user,
+                        get_image_data)
+from api.images import VARIANTS, generate_variants, mark_variants_ready
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeImageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tag = create_tag()
+        cls.ingredient = create_ingredient()
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, image):
+        response = self.client.post(RECIPES_URL, {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': image,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 10}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Recipe.objects.get(id=response.data['id'])
+
+    def get_originals(self):
+        return os.listdir(os.path.join(self.media_root, 'static', 'recipes'))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create(get_image_data('red'))
+        second = self.create(get_image_data('red'))
+        third = self.create(get_image_data('blue'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        self.assertEqual(sorted(self.get_originals()),
+                         sorted({os.path.basename(first.image.name),
+                                 os.path.basename(third.image.name)}))
+
+    def test_variants_replace_original_once_ready(self):
+        first = self.create(get_image_data('green'))
+        second = self.create(get_image_data('green'))
+        data = self.client.get(f'{RECIPES_URL}{first.id}/').json()
+        self.assertEqual(set(data['image_variants'].values()),
+                         {data['image']})
+        generate_variants(first.image.name)
+        self.assertEqual(sorted(mark_variants_ready(first.image.name)),
+                         [first.id, second.id])
+        with mock.patch(
+                'django.core.files.storage.FileSystemStorage.exists',
+                side_effect=AssertionError('обращение к хранилищу')):
+            results = self.client.get(RECIPES_URL).json()['results']
+        for recipe in results:
+            with self.subTest(recipe=recipe['id']):
+                variants = recipe['image_variants']
+                self.assertEqual(set(variants), set(VARIANTS))
+                self.assertEqual(recipe['image'], variants['card'])
+                for variant, url in variants.items():
+                    self.assertTrue(url.endswith(f'_{variant}.webp'))
+
+    def test_command_builds_missing_variants(self):
+        recipe = self.create(get_image_data('yellow'))
+        output = StringIO()
+        call_command('build_image_variants', stdout=output)
+        self.assertIn('Изображений с вариантами: 1', output.getvalue())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.variants_image, recipe.image.name)
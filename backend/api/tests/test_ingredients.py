@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .factories import create_ingredient
+
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+class IngredientSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(15, 0, -1):
+            create_ingredient(f'Соль {number:02}')
+        for number in range(10, 0, -1):
+            create_ingredient(f'морская соль {number:02}')
+        create_ingredient('сахар')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, name):
+        response = self.client.get(INGREDIENTS_URL, {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_matches_go_first(self):
+        self.assertEqual(
+            self.search('соль'),
+            [f'Соль {number:02}' for number in range(1, 16)]
+            + [f'морская соль {number:02}' for number in range(1, 6)]
+        )
+
+    def test_contains_matches_fill_the_limit(self):
+        self.assertEqual(
+            self.search('СОЛЬ 1'),
+            [f'Соль {number:02}' for number in range(10, 16)]
+            + ['морская соль 10']
+        )
+
+    def test_new_ingredient_is_found(self):
+        self.assertEqual(self.search('сах'), ['сахар'])
+        create_ingredient('сахарная пудра')
+        self.assertEqual(self.search('сах'), ['сахар', 'сахарная пудра'])
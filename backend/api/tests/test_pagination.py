@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .factories import create_recipe, create_tag, create_user
+from recipes.models import FavoriteRecipe, Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipePaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tags = [create_tag() for _ in range(2)]
+        recipes = [
+            create_recipe(cls.user, cls.tags[number % 2:number % 2 + 1])
+            for number in range(12)
+        ]
+        for recipe in recipes[::3]:
+            FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+        # У половины рецептов одинаковое время публикации: порядок между
+        # ними задаёт id.
+        Recipe.objects.filter(id__in=[recipe.id for recipe in recipes[:6]]
+                              ).update(pub_date=timezone.now())
+        cls.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def walk(self, params):
+        pages = [self.get(RECIPES_URL, {'cursor': '', 'limit': 5, **params})]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        return pages
+
+    def get_ids(self, pages):
+        return [recipe['id'] for page in pages for recipe in page['results']]
+
+    def test_cursor_pages(self):
+        pages = self.walk({})
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 2])
+        self.assertEqual(self.get_ids(pages), self.expected)
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link(self):
+        pages = self.walk({})
+        previous = self.get(pages[-1]['previous'])
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_cursor_with_filters(self):
+        tag = self.tags[0]
+        pages = self.walk({'tags': tag.slug, 'is_favorited': 1})
+        expected = [
+            pk for pk in self.expected
+            if Recipe.objects.filter(pk=pk, tags=tag,
+                                     favorites__user=self.user).exists()
+        ]
+        self.assertTrue(expected)
+        self.assertEqual(self.get_ids(pages), expected)
+
+    def test_page_number_mode_is_unchanged(self):
+        data = self.get(RECIPES_URL, {'limit': 5, 'page': 2})
+        self.assertEqual(list(data), ['count', 'next', 'previous', 'results'])
+        self.assertEqual(data['count'], 12)
+        self.assertEqual(len(data['results']), 5)
+        self.assertIn('page=3', data['next'])
+        self.assertIsNotNone(data['previous'])
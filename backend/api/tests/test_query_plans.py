@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from .factories import (create_ingredient, create_recipe, create_tag,
+                        create_user)
+from api.management.commands.explain_hot_queries import (
+    explain, find_sequential_scans, get_hot_queries)
+from recipes.models import Cart, FavoriteRecipe, Recipe
+from users.models import Follow
+
+
+class HotQueryPlansTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        authors = [create_user() for _ in range(5)]
+        cls.tag = create_tag()
+        tags = [cls.tag, create_tag()]
+        ingredients = [create_ingredient() for _ in range(5)]
+        for number in range(30):
+            recipe = create_recipe(
+                authors[number % len(authors)], tags[:number % 2 + 1],
+                {ingredient: number + 1 for ingredient in ingredients})
+            if number % 2:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                Cart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, following=author) for author in authors)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # На маленькой тестовой базе PostgreSQL и так выбирает
+            # последовательное чтение, поэтому проверяется, что для
+            # каждого запроса вообще есть путь через индекс.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_no_sequential_scans(self):
+        for name, queries in get_hot_queries(self.user, self.tag).items():
+            for sql in queries:
+                with self.subTest(name, sql=sql):
+                    plan = explain(sql)
+                    self.assertEqual(
+                        find_sequential_scans(plan, connection.vendor), [],
+                        plan)
+
+    def test_real_queries_are_explained(self):
+        queries = get_hot_queries(self.user, self.tag)
+        # Страница ленты: число рецептов, сами рецепты с флагами
+        # пользователя, теги и ингредиенты.
+        feed = queries['лента рецептов']
+        self.assertEqual(len(feed), 4, feed)
+        self.assertNotIn('EXISTS', feed[0])
+        self.assertIn('EXISTS', feed[1])
+        self.assertIn('ROW_NUMBER', ' '.join(queries['подписки']))
+        self.assertIn('CASE', queries['агрегация корзины'][0])
+
+    def test_sequential_scan_is_detected(self):
+        # По времени готовки индекса нет.
+        plan = Recipe.objects.filter(cooking_time=5).order_by().explain()
+        self.assertEqual(find_sequential_scans(plan, connection.vendor),
+                         ['recipes_recipe'])
+
+    def test_command(self):
+        output = StringIO()
+        call_command('explain_hot_queries', stdout=output)
+        self.assertIn('Планы запросов в порядке', output.getvalue())
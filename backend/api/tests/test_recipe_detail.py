@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .factories import (create_ingredient, create_recipe, create_tag,
+                        create_user)
+from recipes.models import FavoriteRecipe, IngredientAmount
+
+
+class RecipeDetailCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tag = create_tag()
+        cls.ingredient = create_ingredient()
+        cls.recipe = create_recipe(create_user(), [cls.tag],
+                                   {cls.ingredient: 100})
+        cls.url = f'/api/recipes/{cls.recipe.id}/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def assert_changed(self, change):
+        etag = self.get()['ETag']
+        change()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response.json()
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_recipe_change(self):
+        def change():
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+
+        self.assertEqual(self.assert_changed(change)['name'],
+                         'Новое название')
+
+    def test_amount_change(self):
+        def change():
+            amount = IngredientAmount.objects.get(recipe=self.recipe)
+            amount.amount = 250
+            amount.save()
+
+        data = self.assert_changed(change)
+        self.assertEqual(data['ingredients'][0]['amount'], 250)
+
+    def test_tags_change(self):
+        tag = create_tag()
+        data = self.assert_changed(lambda: self.recipe.tags.add(tag))
+        self.assertEqual({item['id'] for item in data['tags']},
+                         {self.tag.id, tag.id})
+
+    def test_user_flags_are_not_shared(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        self.assertFalse(self.get().json()['is_favorited'])
+        self.client.force_authenticate(self.user)
+        self.assertTrue(self.get().json()['is_favorited'])
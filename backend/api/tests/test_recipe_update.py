@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .factories import (create_ingredient, create_recipe, create_tag,
+                        create_user)
+from recipes.models import IngredientAmount
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class RecipeUpdateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+        cls.tags = [create_tag() for _ in range(2)]
+        cls.ingredients = [create_ingredient() for _ in range(41)]
+        cls.recipe = create_recipe(
+            cls.author, cls.tags[:1],
+            {ingredient: 10 for ingredient in cls.ingredients[:40]})
+        cls.url = f'/api/recipes/{cls.recipe.id}/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_payload(self, amounts=None, tags=None):
+        amounts = amounts or {}
+        return {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amounts.get(ingredient, 10)}
+                for ingredient in self.ingredients[:40]
+            ],
+            'tags': [tag.id for tag in tags or self.tags[:1]],
+        }
+
+    def patch(self, payload):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(WRITES)
+        ]
+
+    def get_amounts(self):
+        return dict(IngredientAmount.objects.filter(
+            recipe=self.recipe).values_list('ingredient_id', 'amount'))
+
+    def test_one_amount_writes_one_row(self):
+        changed = self.ingredients[5]
+        writes = self.patch(self.get_payload({changed: 25}))
+        amount_writes = [sql for sql in writes
+                         if 'recipes_ingredientamount' in sql]
+        self.assertEqual(len(amount_writes), 1, writes)
+        self.assertTrue(amount_writes[0].startswith('UPDATE'))
+        self.assertEqual(self.get_amounts()[changed.id], 25)
+
+    def test_cooking_time_only(self):
+        writes = self.patch({'cooking_time': 30})
+        self.assertEqual(len(writes), 1, writes)
+        self.assertIn('"cooking_time"', writes[0])
+        self.assertEqual(len(self.get_amounts()), 40)
+
+    def test_unchanged_tags_are_not_rewritten(self):
+        writes = self.patch(self.get_payload())
+        self.assertEqual(writes, [])
+        writes = self.patch(self.get_payload(tags=self.tags))
+        self.assertTrue(all('recipes_recipe_tags' in sql for sql in writes),
+                        writes)
+
+    def test_update_is_atomic(self):
+        payload = self.get_payload({self.ingredients[0]: 99})
+        payload['ingredients'].append(
+            {'id': self.ingredients[40].id, 'amount': 5})
+        with mock.patch.object(IngredientAmount.objects, 'bulk_update',
+                               side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.patch(self.url, payload, format='json')
+        amounts = self.get_amounts()
+        self.assertEqual(len(amounts), 40)
+        self.assertEqual(amounts[self.ingredients[0].id], 10)
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .factories import (create_ingredient, create_recipe, create_tag,
+                        create_user, get_image_data)
+from api.serializers import RecipeSerializer
+from recipes.models import Cart, FavoriteRecipe
+from users.models import Follow
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeListQueriesTest(TestCase):
+    # Количество рецептов, подписки и отметки пользователя загружаются
+    # аннотациями и prefetch, поэтому число запросов не зависит от размера
+    # страницы.
+    LIST_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        authors = [create_user() for _ in range(3)]
+        tags = [create_tag() for _ in range(2)]
+        ingredients = [create_ingredient() for _ in range(3)]
+        for number in range(12):
+            recipe = create_recipe(
+                authors[number % len(authors)], tags,
+                {ingredient: number + 1 for ingredient in ingredients}
+            )
+            if number % 2:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                Cart.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, following=authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assert_constant_queries(self):
+        for limit in (1, 6, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(self.LIST_QUERIES):
+                    response = self.client.get(
+                        RECIPES_URL, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_list_queries(self):
+        self.assert_constant_queries()
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.user)
+        self.assert_constant_queries()
+
+    def test_user_flags(self):
+        self.client.force_authenticate(self.user)
+        results = self.client.get(RECIPES_URL, {'limit': 12}).data['results']
+        self.assertEqual(
+            sum(recipe['is_favorited'] for recipe in results), 6)
+        self.assertEqual(
+            sum(recipe['is_in_shopping_cart'] for recipe in results), 8)
+        self.assertEqual(
+            sum(recipe['author']['is_subscribed'] for recipe in results), 4)
+
+
+class RecipeValidationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [create_tag() for _ in range(3)]
+        cls.ingredients = [create_ingredient() for _ in range(40)]
+
+    def get_serializer(self, ingredient_ids, tag_ids=None):
+        return RecipeSerializer(data={
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': get_image_data(),
+            'tags': tag_ids or [tag.id for tag in self.tags],
+            'ingredients': [{'id': pk, 'amount': 10}
+                            for pk in ingredient_ids],
+        })
+
+    def test_queries_do_not_depend_on_ingredient_count(self):
+        for count in (1, 10, 40):
+            with self.subTest(count=count):
+                serializer = self.get_serializer(
+                    [ingredient.id for ingredient in self.ingredients[:count]])
+                # По одному запросу на ингредиенты и на теги.
+                with self.assertNumQueries(2):
+                    self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_all_errors_are_reported_at_once(self):
+        first, second = self.ingredients[:2]
+        missing_tag = max(tag.id for tag in self.tags) + 1
+        serializer = self.get_serializer(
+            [first.id, second.id, first.id, 100001, 100000],
+            [self.tags[0].id, missing_tag]
+        )
+        with self.assertNumQueries(2):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['ingredients'], [
+            f'Ингредиенты должны быть уникальными, повторяются: {first.id}',
+            'Ингредиентов не существует: 100000, 100001',
+        ])
+        self.assertEqual(serializer.errors['tags'],
+                         [f'Тегов не существует: {missing_tag}'])
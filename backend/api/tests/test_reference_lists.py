@@ -0,0 +1,46 @@
+import hashlib
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.http import quote_etag
+
+from .factories import create_tag
+from api.cache import TAGS_VERSION, get_version
+
+TAGS_URL = '/api/tags/'
+
+
+class ReferenceListCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_matches_content(self):
+        response = self.client.get(TAGS_URL)
+        self.assertEqual(
+            response['ETag'],
+            quote_etag(hashlib.md5(response.content).hexdigest()))
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_etag_survives_content_eviction(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        # Другой воркер или истёкший ключ: ответ строится заново, но
+        # ETag у того же содержимого тот же.
+        cache.delete(f'list:{TAGS_VERSION}:{get_version(TAGS_VERSION)}')
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates_etag(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertEqual(
+            self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+            304)
+        self.tag.name = 'Обед'
+        self.tag.save()
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Обед')
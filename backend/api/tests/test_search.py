@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from .factories import create_recipe, create_user
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user()
+        cls.soup = create_recipe(author, name='Тыквенный суп',
+                                 text='Простой рецепт')
+        cls.stew = create_recipe(author, name='Овощное рагу',
+                                 text='Можно добавить тыквенный соус')
+        cls.pancakes = create_recipe(author, name='Блины',
+                                     text='Подаются с вареньем из тыквы')
+
+    def search(self, query):
+        response = self.client.get(RECIPES_URL,
+                                   {'search': query, 'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_name_match_ranks_above_text_match(self):
+        # Рагу опубликовано позже, но слово есть только в описании.
+        self.assertEqual(self.search('тыквенный'),
+                         [self.soup.id, self.stew.id])
+
+    def test_last_word_is_prefix(self):
+        results = self.search('тыкв')
+        self.assertEqual(results[0], self.soup.id)
+        self.assertEqual(set(results),
+                         {self.soup.id, self.stew.id, self.pancakes.id})
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('суп тыквенный'), [self.soup.id])
+        self.assertEqual(self.search('суп блины'), [])
+
+    def test_index_follows_updates(self):
+        stew = Recipe.objects.get(id=self.stew.id)
+        stew.name = 'Суп-рагу'
+        stew.save()
+        self.assertEqual(set(self.search('суп')), {self.soup.id, stew.id})
+        stew.delete()
+        self.assertEqual(self.search('рагу'), [])
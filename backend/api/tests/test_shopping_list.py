@@ -0,0 +1,75 @@
+from threading import BoundedSemaphore
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .factories import create_ingredient, create_recipe, create_user
+from api.shopping_list import RenderBusy, document_cache
+from recipes.models import Cart, IngredientAmount
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.ingredient = create_ingredient('мука', 'г')
+        cls.recipe = create_recipe(cls.user, ingredients={cls.ingredient: 200})
+        Cart.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        cache.clear()
+        document_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, document_format='txt', **headers):
+        return self.client.get(DOWNLOAD_URL, {'format': document_format},
+                               **headers)
+
+    def test_not_modified_until_ingredients_change(self):
+        etag = self.download()['ETag']
+        self.assertEqual(
+            self.download(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        amount = IngredientAmount.objects.get(recipe=self.recipe)
+        amount.amount = 300
+        amount.save()
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('1. мука - 300 г', b''.join(
+            response.streaming_content).decode())
+
+    def test_errors_are_json(self):
+        self.client.force_authenticate(None)
+        for document_format in ('pdf', 'txt', 'csv'):
+            with self.subTest(document_format=document_format):
+                response = self.download(document_format)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('detail', response.json())
+
+    def test_cart_change_changes_etag(self):
+        etag = self.download()['ETag']
+        Cart.objects.create(user=self.user, recipe=create_recipe(self.user))
+        self.assertNotEqual(self.download()['ETag'], etag)
+
+    def test_busy_renderer_returns_503(self):
+        slots = BoundedSemaphore(1)
+        with mock.patch('api.shopping_list._render_slots', slots):
+            slots.acquire()
+            response = self.download('pdf')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.json()['detail'],
+                             RenderBusy.default_detail)
+            slots.release()
+            response = self.download('pdf')
+            self.assertEqual(response.status_code, 200)
+            b''.join(response.streaming_content)
+        # Место освобождается и после отрисовки.
+        self.assertTrue(slots.acquire(blocking=False))
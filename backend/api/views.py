@@ -1,42 +1,129 @@
-from django.db.models import Sum
-from django.shortcuts import HttpResponse, get_object_or_404
-from django_filters.rest_framework import DjangoFilterBackend
+import hashlib
 
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
+from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import viewsets, views, status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404 as get_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from .filters import RecipeFilter, IngredientSearchFilter
-from .pagination import CustomPageNumberPagination
+from .aggregation import aggregate_ingredients
+from .cache import (INGREDIENTS_VERSION, SHOPPING_LIST_VERSION, TAGS_VERSION,
+                    get_recipe_key, get_version)
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import RecipePagination
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
+from .renderers import (CSVRenderer, JSONListRenderer, PDFRenderer,
+                        TextRenderer)
 from .serializers import (CartSerializer, FavoriteRecipeSerializer,
-                          IngredientSerializer, RecipeListSerializer,
-                          RecipeSerializer, TagSerializer)
+                          IngredientSerializer, RecipeIdsSerializer,
+                          RecipeListSerializer, RecipeSerializer,
+                          TagSerializer)
+from .mixins import CachedListMixin
+from .shopping_list import (TEXT_WRITERS, get_document_key,
+                            render_bounded, stream_and_cache, stream_cached)
+from api_foodgram.metrics import count_cache
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             IngredientAmount, Cart, Tag)
+from recipes.signals import COUNTERS, change_counter, suppress_counters
+from users.models import Follow
+
+USER_FLAGS = ('is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+BULK_INSERT_ATTEMPTS = 3
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
     permission_classes = (IsOwnerOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        return self.annotate_user_flags(
+            Recipe.objects.select_related('author').prefetch_related(
+                'tags',
+                Prefetch(
+                    'ingredientamount_set',
+                    queryset=IngredientAmount.objects.select_related(
+                        'ingredient')
+                )
+            )
+        )
+
+    def annotate_user_flags(self, queryset):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(Cart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, following=OuterRef('author')))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        flags = self.get_user_flags(pk)
+        key = get_recipe_key(pk)
+        data = cache.get(key)
+        count_cache('recipe', data is not None)
+        if data is None:
+            data = dict(self.get_serializer(self.get_object()).data)
+            data.update(dict.fromkeys(USER_FLAGS[:2], False))
+            data['author'] = dict(data['author'], is_subscribed=False)
+            cache.set(key, data)
+        data = dict(data, is_favorited=flags['is_favorited'],
+                    is_in_shopping_cart=flags['is_in_shopping_cart'])
+        data['author'] = dict(data['author'],
+                              is_subscribed=flags['is_subscribed'])
+        content = JSONRenderer().render(data)
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_user_flags(self, pk):
+        if self.request.user.is_anonymous:
+            return dict.fromkeys(USER_FLAGS, False)
+        return get_or_404(
+            self.annotate_user_flags(Recipe.objects.all()).values(
+                *USER_FLAGS),
+            pk=pk
+        )
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'similar'):
             return RecipeListSerializer
         return RecipeSerializer
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({'request': self.request})
+        if self.action in ('list', 'similar'):
+            context['image_variant'] = 'card'
         return context
 
     @staticmethod
@@ -55,6 +142,90 @@ class RecipeViewSet(viewsets.ModelViewSet):
         model_obj.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def get_bulk_ids(request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(id__in=ids).values_list(
+            'id', flat=True))
+        return ids, found
+
+    @staticmethod
+    def get_present(user, model, recipe_ids):
+        return set(model.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+
+    def insert_missing(self, user, model, recipe_ids):
+        # Вставка без ignore_conflicts: если она прошла, счётчики растут
+        # ровно на вставленные строки. Строку, которую успел добавить
+        # параллельный запрос, выдаст ошибка уникальности, и вставка
+        # повторится без неё.
+        attempts = BULK_INSERT_ATTEMPTS
+        while True:
+            added = recipe_ids - self.get_present(user, model, recipe_ids)
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        model(user=user, recipe_id=pk) for pk in added)
+            except IntegrityError:
+                attempts -= 1
+                if not attempts:
+                    raise
+                continue
+            return added
+
+    def bulk_add(self, request, model):
+        ids, found = self.get_bulk_ids(request)
+        counter_model, _, field = COUNTERS[model]
+        with transaction.atomic():
+            added = self.insert_missing(request.user, model, found)
+            change_counter(counter_model, added, field, 1)
+        return Response({'results': [
+            {'id': pk, 'status': 'added' if pk in added else
+             'exists' if pk in found else 'not_found'}
+            for pk in ids
+        ]})
+
+    def bulk_delete(self, request, model):
+        ids, found = self.get_bulk_ids(request)
+        queryset = model.objects.filter(
+            user=request.user, recipe_id__in=found)
+        counter_model, _, field = COUNTERS[model]
+        with transaction.atomic(), suppress_counters():
+            # Блокировка строк: параллельное удаление тех же рецептов
+            # дождётся фиксации и уже не найдёт их, счётчики не уменьшатся
+            # дважды.
+            removed = set(queryset.select_for_update().values_list(
+                'recipe_id', flat=True))
+            queryset.delete()
+            change_counter(counter_model, removed, field, -1)
+        return Response({'results': [
+            {'id': pk, 'status': 'removed' if pk in removed else
+             'absent' if pk in found else 'not_found'}
+            for pk in ids
+        ]})
+
+    @action(detail=False, methods=['POST'], url_path='favorite',
+            url_name='favorite-bulk', permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        return self.bulk_add(request, FavoriteRecipe)
+
+    @favorite_bulk.mapping.delete
+    def delete_favorite_bulk(self, request):
+        return self.bulk_delete(request, FavoriteRecipe)
+
+    @action(detail=False, methods=['POST'], url_path='shopping_cart',
+            url_name='shopping-cart-bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        return self.bulk_add(request, Cart)
+
+    @shopping_cart_bulk.mapping.delete
+    def delete_shopping_cart_bulk(self, request):
+        return self.bulk_delete(request, Cart)
+
     @action(detail=True, methods=["POST"],
             permission_classes=[IsAuthenticated],)
     def favorite(self, request, pk):
@@ -77,53 +248,83 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_method_for_actions(
             request=request, pk=pk, model=Cart)
 
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        get_object_or_404(Recipe, id=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe_id=pk).order_by('-similar_to__score', '-id')
+        return Response(self.get_serializer(recipes, many=True).data)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
+    cache_version_name = TAGS_VERSION
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
+    cache_version_name = INGREDIENTS_VERSION
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = [IngredientSearchFilter]
-    search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return Response(
+            ingredient_index.search(name, settings.INGREDIENT_SEARCH_LIMIT)
+        )
+
 
 class DownloadShoppingCart(views.APIView):
     permission_classes = (IsAuthenticated, )
     pagination_class = None
 
+    renderer_classes = (PDFRenderer, TextRenderer, CSVRenderer,
+                        JSONListRenderer)
+
     def get(self, request):
-        final_list = {}
-        ingredients = IngredientAmount.objects.filter(
-            recipe__cart__user=request.user).values(
-            'ingredient__name', 'ingredient__measurement_unit').annotate(
-            total=Sum('amount')).order_by('ingredient__name')
-        for item in ingredients:
-            name = item['ingredient__name']
-            final_list[name] = {
-                'measurement_unit': item['ingredient__measurement_unit'],
-                'total': item['total']
-            }
-        pdfmetrics.registerFont(
-            TTFont('RussianPunk', 'data/RussianPunk.ttf', 'UTF-8'))
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_list.pdf"')
-        page = canvas.Canvas(response)
-        page.setFont('RussianPunk', size=24)
-        page.drawString(200, 800, 'Список покупок')
-        page.setFont('RussianPunk', size=16)
-        height = 750
-        for i, (name, data) in enumerate(final_list.items(), 1):
-            page.drawString(75, height, (f'{i}. {name} - {data["total"]} '
-                                         f'{data["measurement_unit"]}'))
-            height -= 25
-        page.showPage()
-        page.save()
+        renderer = request.accepted_renderer
+        recipe_ids = list(Cart.objects.filter(user=request.user).values_list(
+            'recipe_id', flat=True))
+        key = get_document_key(recipe_ids,
+                               get_version(SHOPPING_LIST_VERSION),
+                               renderer.format)
+        etag = quote_etag(key)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+            response = StreamingHttpResponse(
+                self.get_content(key, renderer.format, recipe_ids),
+                content_type=content_type
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_list.{renderer.format}"'
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
         return response
+
+    def get_content(self, key, document_format, recipe_ids):
+        items = aggregate_ingredients(recipe_ids)
+        if document_format in TEXT_WRITERS:
+            return TEXT_WRITERS[document_format](items)
+        content = stream_cached(key)
+        count_cache('shopping_list', content is not None)
+        if content is None:
+            return stream_and_cache(render_bounded(items), key)
+        return content
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Ошибки отдаются в JSON, а не с типом запрошенного документа.
+        if isinstance(response, Response) and response.status_code >= 400:
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
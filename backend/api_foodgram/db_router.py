@@ -0,0 +1,72 @@
+import logging
+import threading
+from time import monotonic
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+_state = threading.local()
+_unavailable = {}
+
+
+def get_replica():
+    return getattr(_state, 'replica', None)
+
+
+def set_replica(alias):
+    _state.replica = alias
+
+
+def get_available_replicas():
+    now = monotonic()
+    return [alias for alias in settings.REPLICA_DATABASES
+            if _unavailable.get(alias, 0) <= now]
+
+
+def mark_unavailable(alias):
+    # Реплику не трогаем, пока не пройдёт пауза, все чтения идут в
+    # основную базу. После паузы снова пробуем подключиться.
+    _unavailable[alias] = monotonic() + settings.REPLICA_RETRY_SECONDS
+    logger.warning('Реплика %s недоступна, чтение идёт в %s', alias, PRIMARY)
+
+
+def is_available(alias):
+    if _unavailable.get(alias, 0) > monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+class ReplicaRouter:
+    """Направляет чтения в реплику, выбранную ReplicaMiddleware.
+
+    Вне HTTP-запросов, при записи и после отказа реплики используется
+    основная база.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        alias = get_replica()
+        if alias is None:
+            return None
+        if is_available(alias):
+            return alias
+        set_replica(None)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
@@ -0,0 +1,65 @@
+import os
+from ipaddress import ip_address
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+# Под gunicorn каждый воркер пишет метрики в файлы каталога
+# PROMETHEUS_MULTIPROC_DIR, а /metrics собирает их вместе. Переменную
+# задаёт и каталог создаёт gunicorn.conf.py.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    ('view', 'method'),
+    buckets=(.005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    'foodgram_requests_total',
+    'Количество запросов',
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_db_queries',
+    'Количество SQL-запросов на один запрос',
+    ('view',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешу',
+    ('cache', 'result'),
+)
+PDF_RENDER_DURATION = Histogram(
+    'foodgram_pdf_render_seconds',
+    'Время формирования PDF со списком покупок',
+    buckets=(.01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+
+
+def count_cache(name, hit):
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def is_allowed(address):
+    try:
+        address = ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network
+               for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics(request):
+    if not is_allowed(request.META.get('REMOTE_ADDR', '')):
+        return HttpResponseForbidden()
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,298 @@
+import json
+import logging
+import random
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.views import APIView
+from rest_framework.viewsets import ViewSetMixin
+
+from users.authentication import CachedTokenAuthentication
+
+from .db_router import (get_available_replicas, get_replica,
+                        mark_unavailable, set_replica)
+from .metrics import REQUEST_DURATION, REQUEST_QUERIES, REQUESTS
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_SQL_MAX_LENGTH = 1000
+
+REPLICA_METHODS = ('GET', 'HEAD')
+
+_profiling = threading.local()
+
+
+class QueryRecorder:
+    def __init__(self, track_duplicates):
+        self.count = 0
+        self.duration = 0
+        self.slowest_duration = 0
+        self.slowest_sql = None
+        self.statements = Counter() if track_duplicates else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration > self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+            if self.statements is not None:
+                self.statements[sql] += 1
+
+    def get_duplicates(self, threshold):
+        if self.statements is None:
+            return []
+        return [
+            {'sql': sql[:SLOWEST_SQL_MAX_LENGTH], 'count': count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def _profile_data(getter):
+    @wraps(getter)
+    def data(serializer):
+        marks = getattr(_profiling, 'marks', None)
+        # Вложенные сериализаторы считаются в составе внешнего.
+        if marks is None or _profiling.depth:
+            return getter(serializer)
+        _profiling.depth += 1
+        start = perf_counter()
+        try:
+            return getter(serializer)
+        finally:
+            _profiling.depth -= 1
+            marks['serializer'] += perf_counter() - start
+
+    data.profiled = True
+    return data
+
+
+def profile_serializers():
+    # У DRF нет точки расширения для замера сериализации, поэтому при
+    # включённом профилировании свойство data оборачивается один раз.
+    for cls in (Serializer, ListSerializer):
+        if not getattr(cls.data.fget, 'profiled', False):
+            cls.data = property(_profile_data(cls.data.fget))
+
+
+def _profile_dispatch(dispatch):
+    @wraps(dispatch)
+    def profiled_dispatch(view, request, *args, **kwargs):
+        try:
+            return dispatch(view, request, *args, **kwargs)
+        finally:
+            marks = getattr(_profiling, 'marks', None)
+            if marks is not None:
+                marks['view_end'] = perf_counter()
+
+    profiled_dispatch.profiled = True
+    return profiled_dispatch
+
+
+def profile_views():
+    # process_template_response видит только ответы с отложенной
+    # отрисовкой, а вьюсеты отдают и готовые HttpResponse, и потоковые
+    # ответы. Конец view отмечается при выходе из dispatch.
+    if not getattr(APIView.dispatch, 'profiled', False):
+        APIView.dispatch = _profile_dispatch(APIView.dispatch)
+
+
+class RequestProfilingMiddleware:
+    """Считает запросы к базе и время обработки каждого запроса.
+
+    Метрики уходят в заголовок Server-Timing, а медленные запросы
+    дополнительно пишутся в лог одной строкой JSON. Выключенный
+    middleware не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.REQUEST_PROFILING_THRESHOLD_MS
+        self.duplicate_threshold = (
+            settings.REQUEST_PROFILING_DUPLICATE_THRESHOLD)
+        profile_serializers()
+        profile_views()
+
+    def __call__(self, request):
+        queries = QueryRecorder(track_duplicates=bool(
+            self.duplicate_threshold))
+        request._profiling = {'serializer': 0}
+        _profiling.marks, _profiling.depth = request._profiling, 0
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            _profiling.marks = None
+        end = perf_counter()
+        timings = self.get_timings(request._profiling, queries, start, end)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f}'
+            for name, duration in timings.items()
+        ) + f', sql-count;desc="{queries.count}"'
+        if timings['total'] >= self.threshold:
+            self.log(request, response, queries, timings)
+        return response
+
+    @staticmethod
+    def get_timings(marks, queries, start, end):
+        view_start = marks.get('view_start', start)
+        view_end = marks.get('view_end', end)
+        sql = queries.duration * 1000
+        view = (view_end - view_start) * 1000
+        return {
+            'sql': sql,
+            # Время свойства data внешних сериализаторов вместе с SQL,
+            # который они выполняют, например при ленивой загрузке.
+            'serializer': marks['serializer'] * 1000,
+            'view': view,
+            'render': (end - view_end) * 1000,
+            'total': (end - start) * 1000,
+        }
+
+    def log(self, request, response, queries, timings):
+        match = request.resolver_match
+        logger.warning(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'sql_count': queries.count,
+            **{f'{name}_ms': round(duration, 1)
+               for name, duration in timings.items()},
+            'slowest_sql_ms': round(queries.slowest_duration * 1000, 1),
+            'slowest_sql': (queries.slowest_sql or '')[
+                :SLOWEST_SQL_MAX_LENGTH],
+            'duplicates': queries.get_duplicates(self.duplicate_threshold),
+        }, ensure_ascii=False))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profiling['view_start'] = perf_counter()
+
+    def process_template_response(self, request, response):
+        request._profiling.setdefault('view_end', perf_counter())
+        return response
+
+
+def get_view_label(view_func, method):
+    # У DRF as_view() сохраняет класс и соответствие методов действиям,
+    # поэтому метка получается вида RecipeViewSet.list.
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryRecorder(track_duplicates=False)
+        request._metrics_view = 'unmatched'
+        start = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        view = request._metrics_view
+        method = request.method.lower()
+        REQUEST_DURATION.labels(view, method).observe(perf_counter() - start)
+        REQUESTS.labels(view, method, response.status_code).inc()
+        REQUEST_QUERIES.labels(view).observe(queries.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = get_view_label(
+            view_func, request.method.lower())
+
+
+def get_primary_pin_key(user_id):
+    return f'primary_pin:{user_id}'
+
+
+def get_user_id(request):
+    # Токен проверяется до выбора реплики, то есть в основной базе, и
+    # попадает в кеш токенов: view найдёт пользователя уже без запроса.
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if credentials is None:
+        return None
+    return credentials[0].pk
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения вьюсетов DRF в реплики базы.
+
+    После записи пользователь на REPLICA_PIN_SECONDS закрепляется за
+    основной базой, чтобы сразу видеть свои изменения, пока реплики
+    догоняют основную базу. Метка хранится в общем кеше по id
+    пользователя: клиенты с токеном не возвращают cookie, а следующий
+    запрос может попасть в другой воркер.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            set_replica(None)
+        # DRF записывает пользователя, найденного по токену, и в
+        # исходный запрос Django.
+        user = getattr(request, 'user', None)
+        if (request.method not in REPLICA_METHODS
+                and user is not None and user.is_authenticated):
+            cache.set(get_primary_pin_key(user.pk), True,
+                      settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        cls = getattr(view_func, 'cls', None)
+        if (request.method not in REPLICA_METHODS
+                or cls is None or not issubclass(cls, ViewSetMixin)):
+            return
+        user_id = get_user_id(request)
+        if (user_id is not None
+                and cache.get(get_primary_pin_key(user_id))):
+            return
+        replicas = get_available_replicas()
+        if replicas:
+            set_replica(random.choice(replicas))
+
+    def process_exception(self, request, exception):
+        # Реплика отказала посреди запроса: этот запрос завершится
+        # ошибкой, а следующие пойдут в основную базу.
+        alias = get_replica()
+        if alias is not None and isinstance(exception, DatabaseError):
+            mark_unavailable(alias)
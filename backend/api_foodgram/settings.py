@@ -1,4 +1,5 @@
 import os
+from ipaddress import ip_network
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -35,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_foodgram.middleware.MetricsMiddleware',
+    'api_foodgram.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_foodgram.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_foodgram.urls'
@@ -82,6 +86,55 @@ DATABASES = {
     }
 }
 
+# Реплики перечисляются через запятую: хосты PostgreSQL или, для локальной
+# проверки на SQLite, пути к файлам баз.
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(','))):
+    REPLICA_DATABASES.append(f'replica{number}')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        ('NAME' if 'sqlite' in DATABASES['default']['ENGINE']
+         else 'HOST'): replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api_foodgram.db_router.ReplicaRouter']
+
+# Сколько секунд после записи чтения пользователя идут в основную базу.
+# Метка хранится в кеше по умолчанию, поэтому с несколькими воркерами
+# нужен CACHE_LOCATION.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', default=30))
+
+# Версии данных, токены и готовые ответы должны быть общими для всех
+# воркеров gunicorn и для management-команд, поэтому в docker-compose кеш -
+# memcached. Без CACHE_LOCATION кеш живёт в памяти процесса: этого хватает
+# для runserver и тестов, но не для нескольких воркеров.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': CACHE_LOCATION,
+    } if CACHE_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    # Ключ документа включает корзину и общую версию списка покупок, так
+    # что локальная копия не может устареть и PDF не гоняется по сети.
+    'shopping_lists': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shopping_lists',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SHOPPING_LIST_CACHE_SIZE',
+                                         default=500)),
+        },
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -126,12 +179,74 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', default=2))
+
+PDF_RENDER_QUEUE = int(os.getenv('PDF_RENDER_QUEUE', default=16))
+
+SIMILAR_RECIPES_LIMIT = int(os.getenv('SIMILAR_RECIPES_LIMIT', default=10))
+
+SIMILAR_TAG_BOOST = float(os.getenv('SIMILAR_TAG_BOOST', default=0.5))
+
+# Параметры MinHash LSH для поиска кандидатов: больше полос - выше полнота
+# и медленнее поиск, больше строк в полосе - наоборот. После изменения
+# нужно перестроить индекс командой rebuild_similar.
+SIMILAR_LSH_BANDS = int(os.getenv('SIMILAR_LSH_BANDS', default=20))
+
+SIMILAR_LSH_ROWS = int(os.getenv('SIMILAR_LSH_ROWS', default=3))
+
+SIMILAR_BUCKET_MAX_SIZE = int(os.getenv('SIMILAR_BUCKET_MAX_SIZE',
+                                        default=2000))
+
+# Сколько браузеры и nginx отдают теги и ингредиенты без перепроверки.
+# Перепроверка по ETag дешёвая, поэтому срок небольшой: после изменения
+# справочника устаревший список живёт не дольше него.
+REFERENCE_DATA_MAX_AGE = int(os.getenv('REFERENCE_DATA_MAX_AGE',
+                                       default=60))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT',
+                                        default=20))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+
+# Срок жизни токена в общем кеше. Без CACHE_LOCATION общий уровень не
+# используется.
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=5 * 60))
+
+# Кеш токенов в памяти процесса сбрасывается только в том воркере, где
+# токен отозвали: остальные принимают его ещё до стольких секунд.
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv('TOKEN_CACHE_LOCAL_TTL', default=10))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED',
+                            default='true').lower() == 'true'
+
+# Адреса, с которых Prometheus забирает /metrics, через запятую. По
+# умолчанию только локальные: для сбора из другого контейнера добавьте
+# его сеть, например 172.16.0.0/12.
+METRICS_ALLOWED_NETWORKS = [
+    ip_network(network.strip()) for network in os.getenv(
+        'METRICS_ALLOWED_NETWORKS', default='127.0.0.0/8,::1/128'
+    ).split(',') if network.strip()
+]
+
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING',
+                              default='false').lower() == 'true'
+
+REQUEST_PROFILING_THRESHOLD_MS = float(os.getenv(
+    'REQUEST_PROFILING_THRESHOLD_MS', default=500))
+
+# Сколько одинаковых SQL-запросов за один HTTP-запрос считать признаком N+1,
+# 0 выключает поиск повторов.
+REQUEST_PROFILING_DUPLICATE_THRESHOLD = int(os.getenv(
+    'REQUEST_PROFILING_DUPLICATE_THRESHOLD', default=3))
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 CORS_URLS_REGEX = r'^/api/.*$'
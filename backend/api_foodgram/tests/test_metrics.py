@@ -0,0 +1,65 @@
+import os
+import runpy
+import shutil
+import tempfile
+from ipaddress import ip_network
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from api.tests.factories import create_tag
+
+GUNICORN_CONF = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+
+class MetricsTest(TestCase):
+    @override_settings(METRICS_ENABLED=True)
+    def test_request_metrics(self):
+        create_tag()
+        self.client.get('/api/tags/')
+        content = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'foodgram_requests_total{method="get",status="200",'
+            'view="TagViewSet.list"}', content)
+        self.assertIn('foodgram_request_duration_seconds_bucket', content)
+
+    def test_only_allowed_networks(self):
+        remote = {'REMOTE_ADDR': '10.1.2.3'}
+        self.assertEqual(self.client.get('/metrics', **remote).status_code,
+                         403)
+        with override_settings(
+                METRICS_ALLOWED_NETWORKS=[ip_network('10.0.0.0/8')]):
+            self.assertEqual(
+                self.client.get('/metrics', **remote).status_code, 200)
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class GunicornConfigTest(TestCase):
+    def setUp(self):
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.directory = os.path.join(root, 'prometheus')
+
+    def test_default_directory(self):
+        runpy.run_path(GUNICORN_CONF)
+        self.assertEqual(os.environ['PROMETHEUS_MULTIPROC_DIR'],
+                         '/tmp/prometheus')
+
+    def test_directory_is_created_and_cleaned_on_start(self):
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = self.directory
+        config = runpy.run_path(GUNICORN_CONF)
+        # Конфигурация только задаёт каталог, создаётся он при старте.
+        self.assertFalse(os.path.exists(self.directory))
+        server = mock.Mock()
+        server.cfg.workers = 1
+        config['on_starting'](server)
+        self.assertTrue(os.path.isdir(self.directory))
+        stale = os.path.join(self.directory, 'counter_1.db')
+        open(stale, 'w').close()
+        config['on_starting'](server)
+        self.assertEqual(os.listdir(self.directory), [])
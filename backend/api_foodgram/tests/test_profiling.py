@@ -0,0 +1,106 @@
+import re
+from time import sleep
+from unittest import mock
+
+from django.core.cache import cache
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.test import TestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_tag, create_user
+from recipes.models import Cart
+
+TIMING_RE = re.compile(r'([\w-]+);dur=([\d.]+)')
+
+
+@override_settings(REQUEST_PROFILING=True,
+                   REQUEST_PROFILING_THRESHOLD_MS=10 ** 6)
+class RequestProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user()
+        tags = [create_tag()]
+        for _ in range(3):
+            create_recipe(author, tags)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_timings(self, url):
+        response = self.client.get(url)
+        return response, {name: float(duration) for name, duration
+                          in TIMING_RE.findall(response['Server-Timing'])}
+
+    def test_serializer_time_is_measured(self):
+        response, timings = self.get_timings('/api/recipes/')
+        self.assertEqual(set(timings),
+                         {'sql', 'serializer', 'view', 'render', 'total'})
+        self.assertGreater(timings['serializer'], 0)
+        self.assertLessEqual(timings['serializer'], timings['view'])
+        self.assertIn('sql-count;desc="4"', response['Server-Timing'])
+
+    def test_no_serializer_without_serialization(self):
+        response, timings = self.get_timings('/api/users/1/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(timings['serializer'], 0)
+        self.assertGreater(timings['view'], 0)
+
+
+class RequestProfilingDisabledTest(TestCase):
+    def test_no_header(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/tags/'))
+
+
+@override_settings(REQUEST_PROFILING=True,
+                   REQUEST_PROFILING_THRESHOLD_MS=10 ** 6)
+class ViewEndTest(TestCase):
+    # Задержка в middleware после view должна попасть в render, а не в
+    # view, для любых ответов, а не только отрисовываемых позже.
+    DELAY_MS = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.recipe = create_recipe(cls.user)
+        Cart.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_timings(self, url, params=None):
+        process_response = XFrameOptionsMiddleware.process_response
+
+        def slow_process_response(middleware, request, response):
+            sleep(self.DELAY_MS / 1000)
+            return process_response(middleware, request, response)
+
+        with mock.patch.object(XFrameOptionsMiddleware, 'process_response',
+                               slow_process_response):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, {name: float(duration) for name, duration
+                          in TIMING_RE.findall(response['Server-Timing'])}
+
+    def assert_render_delayed(self, timings):
+        self.assertGreaterEqual(timings['render'], self.DELAY_MS)
+        self.assertLess(timings['view'], self.DELAY_MS)
+
+    def test_plain_response(self):
+        response, timings = self.get_timings(
+            f'/api/recipes/{self.recipe.id}/')
+        self.assertNotIsInstance(response, Response)
+        self.assert_render_delayed(timings)
+
+    def test_streaming_response(self):
+        response, timings = self.get_timings(
+            '/api/recipes/download_shopping_cart/', {'format': 'txt'})
+        self.assertTrue(response.streaming)
+        self.assert_render_delayed(timings)
+
+    def test_drf_response(self):
+        _, timings = self.get_timings('/api/recipes/')
+        self.assert_render_delayed(timings)
@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from api.views import RecipeViewSet
+from api_foodgram import db_router
+from api_foodgram.db_router import get_replica, set_replica
+from api_foodgram.middleware import ReplicaMiddleware
+from recipes.models import Recipe
+from users.authentication import local_tokens
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+FAVORITE_URL = '/api/recipes/favorite/'
+REPLICA = 'replica0'
+
+# Реплика в тестах - отдельная база, а не зеркало основной, как при
+# DB_REPLICAS: по данным, записанным только в неё, видно, откуда пришло
+# чтение. Псевдоним нужно добавить до создания тестовых баз.
+connections.databases.setdefault(REPLICA, {
+    **connections.databases['default'],
+    'TEST': {'NAME': (
+        None if connections['default'].vendor == 'sqlite'
+        else f'test_{connections.databases["default"]["NAME"]}_{REPLICA}'
+    )},
+})
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaPinTest(TestCase):
+    view = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.entries.clear()
+        self.factory = RequestFactory()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.addCleanup(set_replica, None)
+
+    def get_headers(self, token):
+        return {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def write(self, user):
+        def get_response(request):
+            # Так DRF сообщает исходному запросу пользователя из токена.
+            request.user = user
+            return HttpResponse(status=201)
+
+        request = self.factory.post(RECIPES_URL)
+        ReplicaMiddleware(get_response)(request)
+
+    def read(self, **headers):
+        set_replica(None)
+        request = self.factory.get(RECIPES_URL, **headers)
+        ReplicaMiddleware(HttpResponse).process_view(
+            request, self.view, (), {})
+        return get_replica()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.read(), 'replica0')
+        self.assertEqual(self.read(**self.get_headers(self.token)),
+                         'replica0')
+
+    def test_token_user_is_pinned_after_write(self):
+        self.write(self.user)
+        self.assertIsNone(self.read(**self.get_headers(self.token)))
+
+    def test_pin_is_per_user(self):
+        other_token = Token.objects.create(user=create_user())
+        self.write(self.user)
+        self.assertEqual(self.read(**self.get_headers(other_token)),
+                         'replica0')
+        self.assertEqual(self.read(), 'replica0')
+
+    def test_invalid_token_is_not_pinned(self):
+        self.write(self.user)
+        self.assertEqual(
+            self.read(HTTP_AUTHORIZATION='Token invalid'), 'replica0')
+
+    def test_token_is_checked_once(self):
+        headers = self.get_headers(self.token)
+        self.read(**headers)
+        with self.assertNumQueries(0):
+            self.read(**headers)
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaReadsTest(TestCase):
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.token = Token.objects.create(user=cls.user)
+        cls.primary_recipe = create_recipe(cls.user, name='Из основной базы')
+        # Реплика ещё не догнала основную базу и знает другой рецепт.
+        author = User(username='replica', email='replica@foodgram.ru')
+        author.save(using=REPLICA)
+        Recipe.objects.using(REPLICA).bulk_create([Recipe(
+            author=author, name='Из реплики', text='Описание',
+            cooking_time=10)])
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.entries.clear()
+        self.addCleanup(db_router._unavailable.clear)
+        self.client = APIClient()
+
+    def get_names(self, **headers):
+        response = self.client.get(RECIPES_URL, **headers)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_reads_come_from_replica(self):
+        self.assertEqual(self.get_names(), ['Из реплики'])
+
+    def test_writer_reads_from_primary(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.assertEqual(self.get_names(**headers), ['Из реплики'])
+        response = self.client.post(
+            FAVORITE_URL, {'recipes': [self.primary_recipe.id]},
+            format='json', **headers)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.get_names(**headers), ['Из основной базы'])
+        self.assertEqual(self.get_names(), ['Из реплики'])
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with mock.patch.object(connections[REPLICA], 'ensure_connection',
+                               side_effect=OperationalError):
+            with self.assertLogs('api_foodgram.db_router', 'WARNING'):
+                self.assertEqual(self.get_names(), ['Из основной базы'])
+        # Реплика отложена на REPLICA_RETRY_SECONDS.
+        self.assertEqual(self.get_names(), ['Из основной базы'])
+        db_router._unavailable.clear()
+        self.assertEqual(self.get_names(), ['Из реплики'])
+
+    def test_replica_failure_during_request(self):
+        with mock.patch.object(RecipeViewSet, 'list',
+                               side_effect=OperationalError):
+            with self.assertLogs('api_foodgram.db_router', 'WARNING'):
+                with self.assertRaises(OperationalError):
+                    self.client.get(RECIPES_URL)
+        self.assertEqual(self.get_names(), ['Из основной базы'])
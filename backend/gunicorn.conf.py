@@ -0,0 +1,37 @@
+import glob
+import os
+
+bind = '0:8000'
+
+# Django 2.2 не умеет асинхронные представления, поэтому ожидание базы
+# перекрывается потоками: каждый воркер обслуживает несколько запросов.
+# GUNICORN_WORKER_CLASS=sync вернёт прежнее поведение для сравнения.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2 * os.cpu_count() + 1))
+# Для sync число потоков должно быть 1, иначе gunicorn сам включит gthread.
+threads = int(os.environ.get('GUNICORN_THREADS',
+                             4 if worker_class == 'gthread' else 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# Воркеры пишут метрики в файлы этого каталога, а /metrics собирает их
+# вместе. Переменная задаётся здесь, до запуска воркеров: manage.py и
+# другие процессы без gunicorn держат метрики в памяти.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not os.environ.get('CACHE_LOCATION'):
+        server.log.warning(
+            'CACHE_LOCATION не задан: у каждого воркера свой кеш, сброс '
+            'кешей и отзыв токенов не будут видны другим воркерам')
+    # Файлы метрик остаются от прошлого запуска, их нужно очистить до
+    # старта воркеров, иначе счётчики продолжат старые значения.
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -33,7 +33,10 @@ class RecipeAdmin(admin.ModelAdmin):
         'id',
         'name',
         'author',
+        'favorites_count',
+        'in_carts_count',
     )
+    readonly_fields = ('favorites_count', 'in_carts_count')
     list_filter = ('name', 'author', 'tags')
     search_fields = ('name', 'author', 'tags')
     empty_value_display = '-пусто-'
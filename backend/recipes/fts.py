@@ -0,0 +1,81 @@
+"""Полнотекстовый индекс рецептов для SQLite.
+
+В PostgreSQL поиск идёт по полю search_vector, в SQLite его заменяет
+таблица FTS5 с внешним содержимым. SQLite пересоздаёт таблицу при любом
+изменении схемы и теряет при этом триггеры, поэтому установка
+повторяется после каждой миграции.
+"""
+FTS_TABLE = 'recipes_recipe_fts'
+TRIGGERS = {
+    'recipes_recipe_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert
+        AFTER INSERT ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts(rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+    'recipes_recipe_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete
+        AFTER DELETE ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts(
+                recipes_recipe_fts, rowid, name, text
+            ) VALUES ('delete', old.id, old.name, old.text);
+        END
+    """,
+    'recipes_recipe_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update
+        AFTER UPDATE OF name, text ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts(
+                recipes_recipe_fts, rowid, name, text
+            ) VALUES ('delete', old.id, old.name, old.text);
+            INSERT INTO recipes_recipe_fts(rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+}
+CREATE_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5(
+        name, text, content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+# Совпадение в названии весит в десять раз больше, чем в описании.
+RANK = (
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0)')"
+)
+REBUILD = (
+    "INSERT INTO recipes_recipe_fts(recipes_recipe_fts) VALUES ('rebuild')"
+)
+
+
+def install(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type IN ('table', 'trigger') "
+            "AND tbl_name IN ('recipes_recipe', %s)", [FTS_TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        if 'recipes_recipe' not in existing:
+            return
+        if FTS_TABLE in existing and existing.issuperset(TRIGGERS):
+            return
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(RANK)
+        cursor.execute(REBUILD)
+
+
+def uninstall(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
@@ -1,12 +1,32 @@
 import csv
+import json
 import os
+from collections import defaultdict
+from time import perf_counter
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cache import INGREDIENTS_VERSION, SHOPPING_LIST_VERSION, bump_version
 from recipes.models import Ingredient
+from recipes.utils import chunks
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+CSV_HEADER = ['name', 'measurement_unit']
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            for item in json.load(f):
+                yield item['name'].strip(), item['measurement_unit'].strip()
+            return
+        for row in csv.reader(f):
+            row = [value.strip() for value in row]
+            if row != CSV_HEADER:
+                name, measurement_unit = row
+                yield name, measurement_unit
 
 
 class Command(BaseCommand):
@@ -15,17 +35,80 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.csv', nargs='?',
                             type=str)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='count changes without writing them')
+        parser.add_argument('--update', action='store_true',
+                            help='update measurement unit of ingredients '
+                                 'already loaded under the same name when '
+                                 'the file no longer lists the old unit')
 
     def handle(self, *args, **options):
+        start = perf_counter()
+        self.units = {}
+        for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit').iterator():
+            self.units.setdefault(name, {})[measurement_unit] = pk
+        self.inserted = self.updated = self.skipped = self.total = 0
+        path = os.path.join(DATA_ROOT, options['filename'])
         try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                data = csv.reader(f)
-                for row in data:
-                    name, measurement_unit = row
-                    Ingredient.objects.get_or_create(
-                        name=name,
-                        measurement_unit=measurement_unit
-                    )
+            self.file_units = (self.get_file_units(path)
+                               if options['update'] else {})
+            with transaction.atomic():
+                for chunk in chunks(read_rows(path), options['batch_size']):
+                    self.load_chunk(chunk, options)
         except FileNotFoundError:
             raise CommandError('Добавьте файл ingredients в директорию data')
+        if not options['dry_run'] and (self.inserted or self.updated):
+            bump_version(INGREDIENTS_VERSION)
+            if self.updated:
+                bump_version(SHOPPING_LIST_VERSION)
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            f'Строк: {self.total}, добавлено: {self.inserted}, '
+            f'обновлено: {self.updated}, пропущено: {self.skipped}, '
+            f'{self.total / elapsed:.0f} строк/с'
+            + (' (пробный запуск)' if options['dry_run'] else '')
+        )
+
+    def load_chunk(self, chunk, options):
+        to_create, to_update = [], []
+        for name, measurement_unit in chunk:
+            self.total += 1
+            units = self.units.setdefault(name, {})
+            replaced = options['update'] and self.get_replaced(name, units)
+            if measurement_unit in units:
+                self.skipped += 1
+            elif replaced:
+                pk = units.pop(replaced)
+                units[measurement_unit] = pk
+                to_update.append(Ingredient(
+                    id=pk, name=name, measurement_unit=measurement_unit))
+            else:
+                units[measurement_unit] = None
+                to_create.append(Ingredient(
+                    name=name, measurement_unit=measurement_unit))
+        self.inserted += len(to_create)
+        self.updated += len(to_update)
+        if options['dry_run']:
+            return
+        Ingredient.objects.bulk_update(to_update, ['measurement_unit'])
+        Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
+
+    @staticmethod
+    def get_file_units(path):
+        file_units = defaultdict(set)
+        for name, measurement_unit in read_rows(path):
+            file_units[name].add(measurement_unit)
+        return file_units
+
+    def get_replaced(self, name, units):
+        # Заменить можно только единственную единицу ингредиента из базы,
+        # которой нет в файле. Если она в файле есть, ингредиент остаётся
+        # как есть, а строки с другими единицами добавляются отдельно.
+        if len(units) != 1:
+            return None
+        measurement_unit = next(iter(units))
+        if measurement_unit in self.file_units[name]:
+            return None
+        return measurement_unit
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe, SimilarityBucket, SimilarRecipe
+from recipes.similarity import SimilarityIndex, get_buckets
+from recipes.utils import chunks
+
+
+class Command(BaseCommand):
+    help = 'rebuild LSH buckets and the similar recipes table from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        index = SimilarityIndex.load()
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        recipe_buckets = {
+            recipe_id: get_buckets(index.ingredients.get(recipe_id))
+            for recipe_id in recipe_ids
+        }
+        members = defaultdict(list)
+        for recipe_id, buckets in recipe_buckets.items():
+            for bucket in buckets:
+                members[bucket].append(recipe_id)
+        loaded = perf_counter()
+        rows = 0
+        with transaction.atomic():
+            SimilarityBucket.objects.all().delete()
+            SimilarRecipe.objects.all().delete()
+            for batch in chunks(recipe_ids, options['batch_size']):
+                SimilarityBucket.objects.bulk_create(
+                    SimilarityBucket(recipe_id=recipe_id, bucket=bucket)
+                    for recipe_id in batch
+                    for bucket in recipe_buckets[recipe_id])
+                objs = [
+                    SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                                  score=score)
+                    for recipe_id in batch
+                    for similar_id, score in index.get_similar(
+                        recipe_id, self.get_candidates(
+                            recipe_buckets[recipe_id], members))
+                ]
+                SimilarRecipe.objects.bulk_create(objs)
+                rows += len(objs)
+        self.stdout.write(
+            f'Похожих рецептов: {rows}, подписи '
+            f'{loaded - start:.1f} с, всего {perf_counter() - start:.1f} с'
+        )
+
+    @staticmethod
+    def get_candidates(buckets, members):
+        candidate_ids = set()
+        for bucket in buckets:
+            if len(members[bucket]) <= settings.SIMILAR_BUCKET_MAX_SIZE:
+                candidate_ids.update(members[bucket])
+        return candidate_ids
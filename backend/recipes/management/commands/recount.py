@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from recipes.models import Cart, FavoriteRecipe, Recipe
+from recipes.utils import chunks
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe_id'),
+    (Recipe, 'in_carts_count', Cart, 'recipe_id'),
+    (User, 'recipes_count', Recipe, 'author_id'),
+    (User, 'followers_count', Follow, 'following_id'),
+)
+
+
+class Command(BaseCommand):
+    help = 'recount favorites, cart, recipes and followers counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model, field, related_model, key in COUNTERS:
+            fixed = 0
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            for batch in chunks(pks.iterator(), options['batch_size']):
+                fixed += self.recount_batch(
+                    batch, model, field, related_model, key)
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено {fixed}')
+
+    @staticmethod
+    def recount_batch(batch, model, field, related_model, key):
+        with transaction.atomic():
+            objs = list(model.objects.filter(
+                pk__in=batch).select_for_update().only(field))
+            counts = dict(
+                related_model.objects.filter(**{f'{key}__in': batch})
+                .order_by().values_list(key).annotate(Count('pk'))
+            )
+            drifted = []
+            for obj in objs:
+                count = counts.get(obj.pk, 0)
+                if getattr(obj, field) != count:
+                    setattr(obj, field, count)
+                    drifted.append(obj)
+            model.objects.bulk_update(drifted, [field])
+        return len(drifted)
@@ -0,0 +1,183 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import (Cart, FavoriteRecipe, Ingredient,
+                            IngredientAmount, Recipe, Tag)
+from recipes.utils import chunks
+from users.models import Follow, User
+
+TAGS = (
+    ('Завтрак', 'breakfast', Tag.ORANGE),
+    ('Обед', 'lunch', Tag.GREEN),
+    ('Ужин', 'dinner', Tag.PURPLE),
+)
+DISHES = (
+    'борщ', 'суп', 'салат', 'пирог', 'омлет', 'блины', 'каша', 'плов',
+    'рагу', 'котлеты', 'паста', 'запеканка', 'оладьи', 'уха', 'щи',
+    'пельмени', 'жаркое', 'сырники', 'ризотто', 'торт', 'кекс', 'смузи',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'постный', 'праздничный', 'летний', 'острый',
+    'сливочный', 'овощной', 'классический', 'бабушкин', 'лёгкий',
+    'сытный', 'грибной', 'куриный', 'рыбный', 'ягодный',
+)
+STEPS = (
+    'Нарежьте все ингредиенты.', 'Разогрейте духовку до 180 градусов.',
+    'Обжарьте на среднем огне пять минут.', 'Посолите и поперчите.',
+    'Доведите до кипения и варите под крышкой.', 'Перемешайте и подавайте.',
+    'Оставьте настояться на десять минут.', 'Взбейте венчиком до пышности.',
+)
+AMOUNTS = (1, 2, 3, 5, 10, 20, 50, 100, 150, 200, 250, 300, 500)
+
+
+def zipf_cum_weights(size, exponent=1.1):
+    # Популярность авторов, ингредиентов и рецептов распределена по
+    # степенному закону: немногие встречаются часто, остальные редко.
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(size)))
+
+
+def sample(rng, population, cum_weights, k):
+    picked = set(rng.choices(population, cum_weights=cum_weights, k=k * 2))
+    return sorted(picked)[:k]
+
+
+def bulk_create_pks(model, objs):
+    last_pk = model.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    model.objects.bulk_create(objs)
+    if all(obj.pk for obj in objs):
+        return [obj.pk for obj in objs]
+    # SQLite не возвращает ключи из bulk_create, поэтому читаем
+    # только что добавленные строки.
+    return list(model.objects.filter(pk__gt=last_pk).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+class Command(BaseCommand):
+    help = 'generate users, recipes, follows, favorites and carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--authors-share', type=float, default=0.2)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='maximum follows per user')
+        parser.add_argument('--favorites', type=int, default=30,
+                            help='maximum favorites per user')
+        parser.add_argument('--cart', type=int, default=8,
+                            help='maximum cart recipes per user')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: loads_ingrs')
+        self.rng.shuffle(ingredient_ids)
+        self.ingredients = (ingredient_ids,
+                            zipf_cum_weights(len(ingredient_ids)))
+        self.tag_ids = self.get_tags()
+        user_ids = self.create_users(options)
+        authors = user_ids[:max(1, int(len(user_ids)
+                                       * options['authors_share']))]
+        recipe_ids = self.create_recipes(authors, options['recipes'])
+        self.create_relations(
+            Follow, 'following_id', user_ids,
+            (authors, zipf_cum_weights(len(authors))), options['follows'])
+        recipes = (recipe_ids, zipf_cum_weights(len(recipe_ids)))
+        self.create_relations(FavoriteRecipe, 'recipe_id', user_ids,
+                              recipes, options['favorites'])
+        self.create_relations(Cart, 'recipe_id', user_ids,
+                              recipes, options['cart'])
+        call_command('recount', batch_size=self.batch_size,
+                     stdout=self.stdout)
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}, '
+            f'{perf_counter() - start:.1f} с'
+        )
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in TAGS
+            )
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def create_users(self, options):
+        seed = options['seed']
+        if User.objects.filter(username__startswith=f'seed{seed}_').exists():
+            raise CommandError(f'Данные с --seed {seed} уже созданы')
+        password = make_password(options['password'])
+        user_ids = []
+        for batch in chunks(range(options['users']), self.batch_size):
+            user_ids += bulk_create_pks(User, [
+                User(
+                    email=f'seed{seed}_{number}@example.com',
+                    username=f'seed{seed}_{number}',
+                    first_name=f'Имя{number}',
+                    last_name=f'Фамилия{number}',
+                    password=password,
+                )
+                for number in batch
+            ])
+        return user_ids
+
+    def create_recipes(self, authors, count):
+        rng = self.rng
+        author_weights = zipf_cum_weights(len(authors))
+        recipe_ids = []
+        for batch in chunks(range(count), self.batch_size):
+            recipes = [
+                Recipe(
+                    author_id=rng.choices(
+                        authors, cum_weights=author_weights)[0],
+                    name=(f'{rng.choice(ADJECTIVES).capitalize()} '
+                          f'{rng.choice(DISHES)} №{number}'),
+                    text=' '.join(rng.choices(STEPS, k=rng.randint(2, 6))),
+                    cooking_time=rng.choice((5, 10, 15, 20, 30, 45, 60, 90)),
+                )
+                for number in batch
+            ]
+            pks = bulk_create_pks(Recipe, recipes)
+            self.create_recipe_relations(pks)
+            recipe_ids += pks
+        return recipe_ids
+
+    def create_recipe_relations(self, recipe_ids):
+        rng = self.rng
+        amounts, tags = [], []
+        for recipe_id in recipe_ids:
+            for ingredient_id in sample(rng, *self.ingredients,
+                                        k=rng.randint(3, 12)):
+                amounts.append(IngredientAmount(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=rng.choice(AMOUNTS)))
+            for tag_id in rng.sample(self.tag_ids,
+                                     rng.randint(1, len(self.tag_ids))):
+                tags.append(Recipe.tags.through(
+                    recipe_id=recipe_id, tag_id=tag_id))
+        IngredientAmount.objects.bulk_create(amounts)
+        Recipe.tags.through.objects.bulk_create(tags)
+
+    def create_relations(self, model, key, user_ids, targets, limit):
+        rng = self.rng
+        for batch in chunks(user_ids, self.batch_size):
+            objs = [
+                model(user_id=user_id, **{key: target})
+                for user_id in batch
+                for target in sample(rng, *targets, k=rng.randint(0, limit))
+                if model is not Follow or target != user_id
+            ]
+            model.objects.bulk_create(objs, ignore_conflicts=True)
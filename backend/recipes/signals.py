@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+
+from recipes import fts
+from recipes.models import (Cart, FavoriteRecipe, IngredientAmount, Recipe,
+                            SimilarRecipe)
+from recipes.similarity import schedule_refresh, schedule_update
+from users.models import Follow, User
+
+
+_state = threading.local()
+
+
+@contextmanager
+def suppress_counters():
+    """Отключает пересчёт счётчиков в сигналах текущего потока.
+
+    Нужен массовым операциям, которые сами обновляют счётчики одним
+    запросом вместо запроса на каждый удалённый объект.
+    """
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def change_counter(model, pks, field, delta):
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+COUNTERS = {
+    FavoriteRecipe: (Recipe, 'recipe_id', 'favorites_count'),
+    Cart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Follow: (User, 'following_id', 'followers_count'),
+}
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def increment_counter(sender, instance, created, **kwargs):
+    if created and not getattr(_state, 'suppressed', False):
+        model, key, field = COUNTERS[sender]
+        change_counter(model, [getattr(instance, key)], field, 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=Cart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def decrement_counter(sender, instance, **kwargs):
+    if getattr(_state, 'suppressed', False):
+        return
+    model, key, field = COUNTERS[sender]
+    change_counter(model, [getattr(instance, key)], field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def update_similar_on_save(sender, instance, raw=False, update_fields=None,
+                           **kwargs):
+    # Сохранение отдельных полей не затрагивает ингредиенты и теги.
+    if not raw and update_fields is None:
+        schedule_update(instance.pk)
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def update_similar_on_ingredients(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_update(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_similar_on_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for recipe_id in (pk_set or ()) if reverse else (instance.pk,):
+        schedule_update(recipe_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def refresh_similar_on_delete(sender, instance, **kwargs):
+    # Строки с удалённым рецептом удалит каскад, а освободившиеся места
+    # в чужих списках займут следующие по сходству рецепты.
+    schedule_refresh(list(SimilarRecipe.objects.filter(
+        similar_id=instance.pk).values_list('recipe_id', flat=True)))
+
+
+@receiver(post_migrate)
+def install_fts(sender, using, **kwargs):
+    if sender.name == 'recipes':
+        fts.install(connections[using])
@@ -0,0 +1,279 @@
+"""Похожие рецепты.
+
+Сходство - коэффициент Жаккара по наборам ингредиентов, усиленный общими
+тегами. Сравнивать каждый рецепт со всеми слишком дорого, поэтому
+кандидаты ищутся через MinHash LSH: подпись рецепта делится на
+SIMILAR_LSH_BANDS полос, и рецепты, совпавшие хотя бы в одной полосе,
+попадают в одну корзину. Чем выше сходство, тем вероятнее совпадение.
+Корзины хранятся в таблице SimilarityBucket, лучшие
+SIMILAR_RECIPES_LIMIT результатов - в таблице SimilarRecipe.
+"""
+import heapq
+import logging
+import random
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Min
+
+from recipes.models import (IngredientAmount, Recipe, SimilarityBucket,
+                            SimilarRecipe)
+
+logger = logging.getLogger(__name__)
+
+PRIME = 2 ** 61 - 1
+BUCKET_BASE = 1000003
+_rng = random.Random(0)
+HASHES = [
+    (_rng.randrange(1, PRIME), _rng.randrange(PRIME))
+    for _ in range(settings.SIMILAR_LSH_BANDS * settings.SIMILAR_LSH_ROWS)
+]
+
+
+def get_buckets(ingredient_ids):
+    if not ingredient_ids:
+        return []
+    signature = [
+        min((a * ingredient_id + b) % PRIME
+            for ingredient_id in ingredient_ids)
+        for a, b in HASHES
+    ]
+    rows = settings.SIMILAR_LSH_ROWS
+    buckets = []
+    for band in range(settings.SIMILAR_LSH_BANDS):
+        bucket = band
+        for value in signature[band * rows:(band + 1) * rows]:
+            bucket = (bucket * BUCKET_BASE + value) % PRIME
+        buckets.append(bucket)
+    return buckets
+
+
+def get_top(scores):
+    return heapq.nlargest(settings.SIMILAR_RECIPES_LIMIT, scores.items(),
+                          key=lambda item: item[::-1])
+
+
+class SimilarityIndex:
+    def __init__(self, ingredients, tags):
+        self.ingredients = ingredients
+        self.tags = tags
+        self.postings = defaultdict(set)
+        for recipe_id, recipe_ingredients in ingredients.items():
+            for ingredient_id in recipe_ingredients:
+                self.postings[ingredient_id].add(recipe_id)
+        self.sizes = {recipe_id: len(recipe_ingredients)
+                      for recipe_id, recipe_ingredients
+                      in ingredients.items()}
+
+    @classmethod
+    def load(cls, recipe_ids=None):
+        amounts = IngredientAmount.objects.order_by()
+        tags = Recipe.tags.through.objects.all()
+        if recipe_ids is not None:
+            amounts = amounts.filter(recipe_id__in=recipe_ids)
+            tags = tags.filter(recipe_id__in=recipe_ids)
+        recipe_ingredients, recipe_tags = defaultdict(set), defaultdict(set)
+        for recipe_id, ingredient_id in amounts.values_list(
+                'recipe_id', 'ingredient_id').iterator():
+            recipe_ingredients[recipe_id].add(ingredient_id)
+        for recipe_id, tag_id in tags.values_list(
+                'recipe_id', 'tag_id').iterator():
+            recipe_tags[recipe_id].add(tag_id)
+        return cls(recipe_ingredients, recipe_tags)
+
+    def get_jaccard(self, recipe_id, candidate_ids):
+        # Общие ингредиенты считаются пересечением множеств рецептов по
+        # каждому ингредиенту, а не перебором кандидатов в Python.
+        ingredients = self.ingredients.get(recipe_id, set())
+        candidate_ids = set(candidate_ids)
+        shared = Counter()
+        for ingredient_id in ingredients:
+            shared.update(candidate_ids.intersection(
+                self.postings[ingredient_id]))
+        shared.pop(recipe_id, None)
+        size, sizes = len(ingredients), self.sizes
+        return {
+            candidate_id: count / (size + sizes[candidate_id] - count)
+            for candidate_id, count in shared.items()
+        }
+
+    def get_scores(self, recipe_id, candidate_ids):
+        tags = self.tags.get(recipe_id, set())
+        scores = {}
+        for candidate_id, score in self.get_jaccard(
+                recipe_id, candidate_ids).items():
+            other_tags = self.tags.get(candidate_id, set())
+            if tags and other_tags:
+                score *= 1 + settings.SIMILAR_TAG_BOOST * (
+                    len(tags & other_tags) / len(tags | other_tags))
+            scores[candidate_id] = score
+        return scores
+
+    def get_similar(self, recipe_id, candidate_ids):
+        jaccard = self.get_jaccard(recipe_id, candidate_ids)
+        top = heapq.nlargest(settings.SIMILAR_RECIPES_LIMIT,
+                             jaccard.values())
+        if not top:
+            return []
+        # Теги увеличивают оценку не больше чем в 1 + SIMILAR_TAG_BOOST
+        # раз, поэтому кандидатов ниже порога они в список не поднимут.
+        threshold = top[-1] / (1 + settings.SIMILAR_TAG_BOOST)
+        return get_top(self.get_scores(recipe_id, [
+            candidate_id for candidate_id, score in jaccard.items()
+            if score >= threshold
+        ]))
+
+
+def find_candidates(buckets):
+    # Слишком большие корзины собирают рецепты из одних популярных
+    # ингредиентов и только замедляют поиск, их пропускаем.
+    small = SimilarityBucket.objects.filter(bucket__in=buckets).values(
+        'bucket').order_by().annotate(total=Count('pk')).filter(
+        total__lte=settings.SIMILAR_BUCKET_MAX_SIZE).values('bucket')
+    return set(SimilarityBucket.objects.filter(
+        bucket__in=small).values_list('recipe_id', flat=True))
+
+
+def _save_similar(recipe_id, similar):
+    SimilarRecipe.objects.filter(recipe_id=recipe_id).delete()
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                      score=score)
+        for similar_id, score in similar)
+
+
+def _refresh(recipe_id):
+    buckets = SimilarityBucket.objects.filter(
+        recipe_id=recipe_id).values_list('bucket', flat=True)
+    candidate_ids = find_candidates(list(buckets))
+    index = SimilarityIndex.load(candidate_ids | {recipe_id})
+    _save_similar(recipe_id, index.get_similar(recipe_id, candidate_ids))
+
+
+def update_similar(recipe_id):
+    """Пересчитывает похожие рецепты после изменения одного рецепта.
+
+    Корзины и список самого рецепта строятся заново. В списках
+    кандидатов рецепт добавляется или получает новую оценку, а списки,
+    где он подешевел или выпал, строятся заново: на освободившееся место
+    может прийти рецепт, которого среди кандидатов нет.
+    """
+    with transaction.atomic():
+        buckets = get_buckets(set(IngredientAmount.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', flat=True)))
+        SimilarityBucket.objects.filter(recipe_id=recipe_id).delete()
+        SimilarityBucket.objects.bulk_create(
+            SimilarityBucket(recipe_id=recipe_id, bucket=bucket)
+            for bucket in buckets)
+        existing = {
+            obj.recipe_id: obj
+            for obj in SimilarRecipe.objects.filter(similar_id=recipe_id)
+        }
+        candidate_ids = find_candidates(buckets) - {recipe_id}
+        index = SimilarityIndex.load(
+            candidate_ids | set(existing) | {recipe_id})
+        _save_similar(recipe_id, index.get_similar(recipe_id, candidate_ids))
+        scores = index.get_scores(recipe_id, candidate_ids | set(existing))
+        for other_id in _update_reverse(recipe_id, scores, existing):
+            _refresh(other_id)
+
+
+def _update_reverse(recipe_id, scores, existing):
+    stale = [other_id for other_id, obj in existing.items()
+             if scores.get(other_id, 0) < obj.score]
+    updated = [obj for other_id, obj in existing.items()
+               if other_id not in stale]
+    for obj in updated:
+        obj.score = scores[obj.recipe_id]
+    SimilarRecipe.objects.bulk_update(updated, ['score'])
+    new = {other_id: score for other_id, score in scores.items()
+           if other_id not in existing}
+    rows = SimilarRecipe.objects.filter(recipe_id__in=list(new)).values_list(
+        'recipe_id').order_by().annotate(Count('pk'), Min('score'))
+    lists = {other_id: (total, lowest) for other_id, total, lowest in rows}
+    limit = settings.SIMILAR_RECIPES_LIMIT
+    added = [
+        other_id for other_id, score in new.items()
+        if other_id not in lists or lists[other_id][0] < limit
+        or score >= lists[other_id][1]
+    ]
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe_id=other_id, similar_id=recipe_id,
+                      score=new[other_id])
+        for other_id in added)
+    _trim([other_id for other_id in added
+           if other_id in lists and lists[other_id][0] >= limit])
+    return stale
+
+
+def _trim(recipe_ids):
+    # Рецепт вытеснил худший результат из заполненных списков, при
+    # равных оценках порядок тот же, что и в get_top.
+    excess = defaultdict(list)
+    for obj in SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).order_by(
+            'recipe_id', '-score', '-similar_id'):
+        excess[obj.recipe_id].append(obj.pk)
+    SimilarRecipe.objects.filter(pk__in=[
+        pk for pks in excess.values()
+        for pk in pks[settings.SIMILAR_RECIPES_LIMIT:]
+    ]).delete()
+
+
+# Один поток: пересчёты затрагивают общие списки похожих рецептов и
+# при параллельном выполнении перезаписывали бы друг друга.
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similar')
+_pending = set()
+_pending_lock = Lock()
+
+
+def _run(task, recipe_id):
+    close_old_connections()
+    # Изменения, сделанные после начала пересчёта, запланируют новый.
+    with _pending_lock:
+        _pending.discard((task, recipe_id))
+    try:
+        if Recipe.objects.filter(pk=recipe_id).exists():
+            task(recipe_id)
+    except Exception:
+        logger.exception('Не удалось пересчитать похожие рецепты для %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def _submit(task, recipe_id):
+    with _pending_lock:
+        if (task, recipe_id) in _pending:
+            return
+        _pending.add((task, recipe_id))
+    executor.submit(_run, task, recipe_id)
+
+
+class _Scheduled(namedtuple('_Scheduled', 'task recipe_id')):
+    def __call__(self):
+        _submit(self.task, self.recipe_id)
+
+
+def _schedule(task, recipe_id):
+    # Одна транзакция может менять рецепт несколько раз: ингредиенты
+    # по одному, теги, сам рецепт. Пересчёт после неё нужен один.
+    callback = _Scheduled(task, recipe_id)
+    connection = transaction.get_connection()
+    if callback not in (func for _, func in connection.run_on_commit):
+        transaction.on_commit(callback)
+
+
+def schedule_update(recipe_id):
+    """Пересчитывает похожие рецепты в фоне после фиксации транзакции.
+
+    Запрос не ждёт пересчёта, а ошибка в нём только пишется в лог.
+    """
+    _schedule(update_similar, recipe_id)
+
+
+def schedule_refresh(recipe_ids):
+    for recipe_id in recipe_ids:
+        _schedule(_refresh, recipe_id)
@@ -0,0 +1,48 @@
+import os
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.management.commands.loads_ingrs import DATA_ROOT, read_rows
+from recipes.models import Ingredient
+
+CSV_ROWS = set(read_rows(os.path.join(DATA_ROOT, 'ingredients.csv')))
+
+
+def get_ingredients():
+    return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+
+class LoadsIngredientsTest(TestCase):
+    def load(self, *args):
+        call_command('loads_ingrs', *args, stdout=StringIO())
+
+    def test_shipped_csv(self):
+        self.load()
+        self.assertEqual(get_ingredients(), CSV_ROWS)
+        self.load('--update')
+        self.assertEqual(get_ingredients(), CSV_ROWS)
+
+    def test_shipped_csv_update_on_empty_database(self):
+        self.load('--update')
+        self.assertEqual(get_ingredients(), CSV_ROWS)
+
+    def test_update_changes_measurement_unit(self):
+        baking_powder = Ingredient.objects.create(
+            name='пекарский порошок', measurement_unit='кг')
+        salmon = Ingredient.objects.create(
+            name='стейк семги', measurement_unit='г')
+        self.load('--update')
+        self.assertEqual(get_ingredients(), CSV_ROWS)
+        # Единицы 'кг' в файле нет, поэтому первая строка меняет единицу
+        # существующего ингредиента, а вторая добавляет новый. Единица 'г'
+        # у стейка в файле есть, и он остаётся без изменений.
+        baking_powder.refresh_from_db()
+        self.assertEqual(baking_powder.measurement_unit, 'г')
+        salmon.refresh_from_db()
+        self.assertEqual(salmon.measurement_unit, 'г')
+
+    def test_dry_run_writes_nothing(self):
+        self.load('--dry-run', '--update')
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from api.tests.factories import create_recipe, create_user
+from recipes.models import FavoriteRecipe, Recipe
+from recipes.signals import suppress_counters
+
+
+class SuppressCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.recipe = create_recipe(cls.user)
+
+    def get_count(self):
+        return Recipe.objects.get(pk=self.recipe.pk).favorites_count
+
+    def test_nested_use_keeps_counters_suppressed(self):
+        with suppress_counters():
+            with suppress_counters():
+                pass
+            FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(self.get_count(), 0)
+
+    def test_counters_resume_after_exit(self):
+        with suppress_counters():
+            with suppress_counters():
+                pass
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(self.get_count(), 1)
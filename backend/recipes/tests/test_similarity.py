@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.factories import (create_ingredient, create_recipe,
+                                 create_tag, create_user)
+from recipes import similarity
+from recipes.models import IngredientAmount, SimilarRecipe
+
+
+class ImmediateExecutor:
+    def submit(self, task, *args):
+        task(*args)
+
+
+class SimilarRecipesUpdateTest(TransactionTestCase):
+    # on_commit срабатывает только вне обёртки TestCase.
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(similarity, 'executor',
+                                    ImmediateExecutor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = create_user()
+        self.ingredients = [create_ingredient() for _ in range(6)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def create(self, *numbers):
+        with transaction.atomic():
+            return create_recipe(self.author, ingredients={
+                self.ingredients[number]: 10 for number in numbers})
+
+    def get_similar_ids(self, recipe):
+        return list(SimilarRecipe.objects.filter(recipe=recipe).order_by(
+            '-score').values_list('similar_id', flat=True))
+
+    def patch(self, recipe, payload):
+        response = self.client.patch(f'/api/recipes/{recipe.id}/', payload,
+                                     format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_new_recipes_are_indexed(self):
+        first = self.create(0, 1, 2, 3)
+        second = self.create(0, 1, 2, 3)
+        self.assertEqual(self.get_similar_ids(first), [second.id])
+        self.assertEqual(self.get_similar_ids(second), [first.id])
+
+    def test_ingredient_changes_outside_api_update_index(self):
+        first = self.create(0, 1, 2, 3)
+        second = self.create(0, 1, 2, 3)
+        # Так ингредиенты меняются в админке: по одному объекту.
+        for amount in IngredientAmount.objects.filter(recipe=second):
+            amount.delete()
+        IngredientAmount.objects.create(
+            recipe=second, ingredient=self.ingredients[5], amount=1)
+        self.assertEqual(self.get_similar_ids(first), [])
+        self.assertEqual(self.get_similar_ids(second), [])
+
+    @override_settings(SIMILAR_RECIPES_LIMIT=1)
+    def test_deleted_recipe_is_replaced_in_lists(self):
+        first = self.create(0, 1, 2, 3)
+        second = self.create(0, 1, 2, 3)
+        third = self.create(0, 1, 2, 4)
+        self.assertEqual(self.get_similar_ids(first), [second.id])
+        second.delete()
+        self.assertEqual(self.get_similar_ids(first), [third.id])
+
+    def test_updates_are_scheduled(self):
+        recipe = self.create(0, 1)
+        tag = create_tag()
+        with mock.patch.object(similarity, 'update_similar') as update:
+            self.patch(recipe, {'name': 'Новое название'})
+            update.assert_not_called()
+            self.patch(recipe, {'ingredients': [
+                {'id': self.ingredients[2].id, 'amount': 5}]})
+            update.assert_called_once_with(recipe.id)
+            update.reset_mock()
+            recipe.tags.add(tag)
+            update.assert_called_once_with(recipe.id)
+
+    def test_failed_update_does_not_fail_request(self):
+        recipe = self.create(0, 1)
+        with mock.patch.object(similarity, 'update_similar',
+                               side_effect=DatabaseError):
+            with self.assertLogs('recipes.similarity', 'ERROR'):
+                self.patch(recipe, {'ingredients': [
+                    {'id': self.ingredients[2].id, 'amount': 5}]})
+
+    def test_pending_updates_are_merged(self):
+        recipe = self.create(0, 1)
+        executor = mock.Mock()
+        self.addCleanup(similarity._pending.clear)
+        with mock.patch.object(similarity, 'update_similar') as update:
+            with mock.patch.object(similarity, 'executor', executor):
+                for _ in range(2):
+                    similarity.schedule_update(recipe.id)
+                executor.submit.assert_called_once()
+                task, *args = executor.submit.call_args[0]
+                task(*args)
+                update.assert_called_once_with(recipe.id)
+                # После начала пересчёта изменения планируют новый.
+                similarity.schedule_update(recipe.id)
+            self.assertEqual(executor.submit.call_count, 2)
@@ -6,7 +6,9 @@ from .models import Follow, User
 class UserAdmin(admin.ModelAdmin):
     list_display = (
         'pk', 'username', 'email',
-        'first_name', 'last_name')
+        'first_name', 'last_name',
+        'recipes_count', 'followers_count')
+    readonly_fields = ('recipes_count', 'followers_count')
     search_fields = ('email', 'username', 'first_name', 'last_name')
     list_filter = ('email', 'username', 'first_name', 'last_name')
     empty_value_display = '-пусто-'
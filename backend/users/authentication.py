@@ -0,0 +1,103 @@
+import copy
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """Ограниченный по размеру кеш токенов в памяти процесса.
+
+    Старые записи вытесняются по LRU, каждая живёт не дольше ttl секунд:
+    сброс из сигнала виден только текущему процессу, остальные воркеры
+    узнают об изменении пользователя по истечении этого срока.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (user, monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+local_tokens = LocalTokenCache(settings.TOKEN_CACHE_SIZE,
+                               settings.TOKEN_CACHE_LOCAL_TTL)
+
+
+def get_token_cache_key(key):
+    return f'token:{key}'
+
+
+def is_cache_shared():
+    # Кеш в памяти процесса не годится как второй уровень: сброс из
+    # сигнала не дошёл бы до других воркеров, и отозванный токен
+    # оставался бы у них действительным TOKEN_CACHE_TTL секунд.
+    return bool(settings.CACHE_LOCATION)
+
+
+def forget_token(key):
+    local_tokens.delete(key)
+    if is_cache_shared():
+        cache.delete(get_token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для уже известных токенов.
+
+    Пользователь ищется сначала в памяти процесса, затем в общем кеше
+    (если задан CACHE_LOCATION) и только потом в базе. Удаление токена
+    и изменения пользователя сразу видны текущему процессу и общему
+    кешу, а остальные воркеры принимают старый токен ещё до
+    TOKEN_CACHE_LOCAL_TTL секунд.
+    """
+
+    def get_user(self, key):
+        shared = is_cache_shared()
+        if shared:
+            user = cache.get(get_token_cache_key(key))
+            if user is not None:
+                return user
+        user, _ = super().authenticate_credentials(key)
+        if shared:
+            cache.set(get_token_cache_key(key), user,
+                      settings.TOKEN_CACHE_TTL)
+        return user
+
+    def authenticate_credentials(self, key):
+        user = local_tokens.get(key)
+        if user is None:
+            user = self.get_user(key)
+            local_tokens.set(key, user)
+        # Каждый запрос получает свою копию, чтобы изменения атрибутов
+        # пользователя во view не попадали в кеш.
+        user = copy.copy(user)
+        token = Token(key=key, user_id=user.pk)
+        token.user = user
+        return user, token
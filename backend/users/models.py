@@ -2,6 +2,17 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
+def get_update_fields(instance):
+    # Счётчики меняются только через F() в сигналах, а генерируемые поля
+    # заполняют база и фоновые задачи, поэтому обычное сохранение объекта
+    # не должно перезаписывать их устаревшими значениями.
+    skip = instance.COUNTER_FIELDS + getattr(instance, 'GENERATED_FIELDS', ())
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in skip
+    ]
+
+
 class User(AbstractUser):
     email = models.EmailField(
         verbose_name='Электронная почта',
@@ -24,8 +35,19 @@ class User(AbstractUser):
         blank=True,
         unique=True
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков',
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ['id']
@@ -35,6 +57,11 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = get_update_fields(self)
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.authentication import forget_token
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, update_fields=None,
+                       **kwargs):
+    # Деактивация, смена пароля и любые другие изменения пользователя
+    # должны сразу вступать в силу для его токена.
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+            'key', flat=True):
+        forget_token(key)
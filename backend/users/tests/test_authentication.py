@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_user
+from users.authentication import get_token_cache_key, local_tokens
+
+ME_URL = '/api/users/me/'
+
+
+class RevokedTokenTest(TestCase):
+    def setUp(self):
+        local_tokens.entries.clear()
+        cache.clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        # Первый запрос кладёт пользователя в кеши.
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+    def assert_rejected(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def check_revocations(self):
+        for revoke in (self.delete_token, self.deactivate_user):
+            with self.subTest(revoke=revoke.__name__):
+                self.setUp()
+                revoke()
+                self.assert_rejected()
+
+    def delete_token(self):
+        self.token.delete()
+
+    def deactivate_user(self):
+        self.user.is_active = False
+        self.user.save()
+
+    def test_cached_token_is_not_queried_again(self):
+        # Остаётся только запрос is_subscribed из сериализатора.
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_revoked_token_is_rejected(self):
+        self.check_revocations()
+
+    def test_process_cache_is_not_used_as_shared(self):
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
+
+    @override_settings(CACHE_LOCATION='memcached:11211')
+    def test_revoked_token_is_rejected_with_shared_cache(self):
+        self.check_revocations()
+
+    @override_settings(CACHE_LOCATION='memcached:11211')
+    def test_other_worker_sees_revocation(self):
+        local_tokens.entries.clear()
+        self.client.get(ME_URL)
+        self.assertIsNotNone(cache.get(get_token_cache_key(self.token.key)))
+        self.token.delete()
+        # Локальный кеш другого воркера уже истёк, общий сброшен сигналом.
+        local_tokens.entries.clear()
+        self.assert_rejected()
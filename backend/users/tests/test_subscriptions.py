@@ -0,0 +1,58 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from users.models import Follow
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsQueriesTest(TestCase):
+    # Количество подписок, авторы и последние рецепты всех авторов
+    # страницы.
+    SUBSCRIPTIONS_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.authors = [create_user() for _ in range(100)]
+        for number, author in enumerate(cls.authors):
+            for _ in range(number % 4):
+                create_recipe(author)
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, following=author) for author in cls.authors)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_queries_do_not_depend_on_authors(self):
+        for limit in (1, 10, 100):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(self.SUBSCRIPTIONS_QUERIES):
+                    response = self.client.get(
+                        SUBSCRIPTIONS_URL,
+                        {'limit': limit, 'recipes_limit': 2})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipes_limit(self):
+        results = self.client.get(
+            SUBSCRIPTIONS_URL, {'limit': 100, 'recipes_limit': 2}
+        ).data['results']
+        for author in results:
+            with self.subTest(author=author['id']):
+                self.assertTrue(author['is_subscribed'])
+                self.assertEqual(len(author['recipes']),
+                                 min(author['recipes_count'], 2))
+        self.assertEqual(sum(author['recipes_count'] for author in results),
+                         sum(number % 4 for number in range(100)))
+
+    def test_latest_recipes_first(self):
+        author = self.authors[3]
+        recipes = list(author.recipes.order_by('-pub_date', '-id'))
+        result = next(
+            item for item in self.client.get(
+                SUBSCRIPTIONS_URL, {'limit': 100, 'recipes_limit': 2}
+            ).data['results'] if item['id'] == author.id)
+        self.assertEqual([recipe['id'] for recipe in result['recipes']],
+                         [recipe.id for recipe in recipes[:2]])
@@ -1,3 +1,7 @@
+from collections import defaultdict
+
+from django.db.models import BooleanField, F, Value, Window
+from django.db.models.functions import RowNumber
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, views
 from rest_framework.generics import ListAPIView
@@ -6,10 +10,29 @@ from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 
+from recipes.models import Recipe
 from users.models import User, Follow
 from users.serializers import CustomUserSerializer, FollowSerializer
 
 
+def get_latest_recipes(author_ids, limit=None):
+    fields = ('id', 'author_id', 'name', 'image', 'cooking_time', 'pub_date')
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is None or not author_ids:
+        return recipes.only(*fields).order_by('-pub_date', '-id')
+    ranked = recipes.annotate(recipe_rank=Window(
+        expression=RowNumber(),
+        partition_by=[F('author_id')],
+        order_by=[F('pub_date').desc(), F('id').desc()]
+    )).order_by().values(*fields, 'recipe_rank')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+        'ORDER BY pub_date DESC, id DESC',
+        (*params, limit)
+    )
+
+
 class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
     queryset = User.objects.all()
@@ -67,4 +90,23 @@ class FollowListViewSet(ListAPIView):
     pagination_class = LimitOffsetPagination
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
+
+    def paginate_queryset(self, queryset):
+        authors = super().paginate_queryset(queryset)
+        if authors is None:
+            authors = list(queryset)
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        recipes = defaultdict(list)
+        for recipe in get_latest_recipes(
+            [author.id for author in authors],
+            int(recipes_limit) if recipes_limit else None
+        ):
+            recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = recipes[author.id]
+        return authors